@@ -1,37 +1,39 @@
+import time
+# Measured from here so --timings reports the cost of importing this module's dependencies
+_import_started = time.perf_counter()
+
 import os
-import json
-import requests
-from requests.auth import HTTPBasicAuth
-from datetime import datetime, timedelta
-from fetchCapacity import write_capacity_to_structured_json # type: ignore
-from fetchPRnumber import get_pull_requests_for_work_item
-import importlib.util
-
-# -------------------- Configuration --------------------
-config_path = os.path.join(os.path.dirname(__file__), "config.json")
-with open(config_path, "r", encoding="utf-8") as f:
-    config = json.load(f)
-
-personal_access_token = config["personal_access_token"]
-organization = config["organization"]
-project = config["project"]
-api_version = config["api_version"]
-iteration_path = config["iteration_path"]
-area_path = config["area_path"]
-team = config.get("team")
-
-auth = HTTPBasicAuth('', personal_access_token)
-headers = {"Content-Type": "application/json"}
-
-# Import and run fetch_efforts_from_ado from fetchEfforts.py
-spec = importlib.util.spec_from_file_location("fetchEfforts", os.path.join(os.path.dirname(__file__), "fetchEfforts.py"))
-fetchEfforts = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(fetchEfforts)
-fetchEfforts.fetch_efforts_from_ado(config)
+import re
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from workItemStore import load_store, save_store
+from fileUtils import atomic_json_array_writer, load_config
+from refreshCoordinator import coordinated_refresh, DEFAULT_MAX_AGE_SECONDS
+from refreshMetrics import metrics
+
+# Importing this module has no side effects: configuration is loaded and ADO is only
+# called when a function (or a CLI stage, see main) runs. The HTTP stack is imported on
+# first use so that a CLI call whose data is still fresh does not pay for it.
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def get_client(config):
+    from adoClient import get_client
+    return get_client(config)
+
+def get_base_url(config):
+    from adoClient import get_base_url
+    return get_base_url(config)
 
 # -------------------- Work Item Queries --------------------
-def get_area_and_iteration_work_items(area_path, iteration_path):
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/wiql?api-version={api_version}"
+def get_area_and_iteration_work_items(config, area_path, iteration_path, with_as_of=False):
+    """
+    Returns the IDs of the work items in the area/iteration. With with_as_of, returns
+    (ids, as_of) where as_of is the server time the query was evaluated at.
+    """
+    url = f"{get_base_url(config)}/{config['organization']}/{config['project']}/_apis/wit/wiql?api-version={config['api_version']}"
     query = {
         "query": (
             f"SELECT [System.Id] FROM WorkItems "
@@ -39,180 +41,820 @@ def get_area_and_iteration_work_items(area_path, iteration_path):
             f"AND [System.IterationPath] = '{iteration_path}'"
         )
     }
-    response = requests.post(url, json=query, auth=auth, headers=headers)
+    response = get_client(config).post(url, json=query)
     if response.status_code != 200:
         print(f"[ERROR] Response status: {response.status_code}")
         print(f"[ERROR] Response content: {response.text}")
     response.raise_for_status()
-    return [item["id"] for item in response.json().get("workItems", [])]
+    result = response.json()
+    work_item_ids = [item["id"] for item in result.get("workItems", [])]
+    return (work_item_ids, result.get("asOf")) if with_as_of else work_item_ids
 
-def get_work_item_details(work_item_id):
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems/{work_item_id}?api-version=7.1"
-    response = requests.get(url, auth=auth, headers=headers)
+def get_work_item_details(config, work_item_id):
+    url = f"{get_base_url(config)}/{config['organization']}/{config['project']}/_apis/wit/workitems/{work_item_id}?$expand=relations&api-version=7.1"
+    response = get_client(config).get(url)
     response.raise_for_status()
-    return response.json()
+    work_item = response.json()
+    work_item.setdefault("relations", [])
+    return work_item
+
+# Fields read by the insight builder in process_sprint_insights
+INSIGHT_FIELDS = [
+    "System.Id",
+    "System.Title",
+    "System.WorkItemType",
+    "System.State",
+    "System.Rev",
+    "System.ChangedDate",
+    "System.AreaPath",
+    "System.IterationPath",
+    "System.CreatedDate",
+    "System.CreatedBy",
+    "System.Description",
+    "System.AssignedTo",
+    "System.Tags",
+    "Microsoft.VSTS.Common.Priority",
+    "Microsoft.VSTS.Common.StackRank",
+    "Microsoft.VSTS.Scheduling.TargetDate",
+    "Microsoft.VSTS.Scheduling.OriginalEstimate",
+    "Microsoft.VSTS.Scheduling.RemainingWork",
+    "Microsoft.VSTS.Scheduling.CompletedWork",
+]
+
+BATCH_SIZE = 200
+
+def get_work_items_details_batch(config, work_item_ids, fields=None, expand=None):
+    """
+    Fetches work item details in batches of BATCH_SIZE through the workitemsbatch endpoint.
+    Args:
+        config (dict): Azure DevOps configuration.
+        work_item_ids (list): IDs of the work items to fetch.
+        fields (list, optional): Field reference names to return. Defaults to INSIGHT_FIELDS.
+        expand (str, optional): Expand option (e.g. "Relations"). ADO rejects "fields" combined
+            with "$expand", so all fields are returned when this is set.
+    Returns:
+        dict: Mapping of work item ID to its details, in the same shape as get_work_item_details.
+    """
+    url = f"{get_base_url(config)}/{config['organization']}/{config['project']}/_apis/wit/workitemsbatch?api-version=7.1"
+    client = get_client(config)
+    details = {}
+    for i in range(0, len(work_item_ids), BATCH_SIZE):
+        body = {"ids": work_item_ids[i:i + BATCH_SIZE], "errorPolicy": "Omit"}
+        if expand:
+            body["$expand"] = expand
+        else:
+            body["fields"] = fields or INSIGHT_FIELDS
+        response = client.post(url, json=body)
+        response.raise_for_status()
+        for item in response.json().get("value", []):
+            # errorPolicy=Omit returns null for items that could not be read
+            if item:
+                if expand and expand.lower() in ("relations", "all"):
+                    # ADO omits "relations" for items that have none
+                    item.setdefault("relations", [])
+                details[item["id"]] = item
+    return details
+
+UPDATES_PAGE_SIZE = 200
 
-def get_work_item_changes(work_item_id):
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workItems/{work_item_id}/updates?api-version={api_version}"
-    response = requests.get(url, auth=auth, headers=headers)
+def iter_work_item_updates(config, work_item_id, skip=0):
+    """
+    Yields the /updates history of a work item one page at a time.
+    Args:
+        config (dict): Azure DevOps configuration.
+        work_item_id (int): The work item ID.
+        skip (int): Number of updates already known; only later updates are returned.
+    Yields:
+        list: One page of updates.
+    """
+    client = get_client(config)
+    while True:
+        url = (
+            f"{get_base_url(config)}/{config['organization']}/{config['project']}/_apis/wit/workItems/{work_item_id}/updates"
+            f"?$top={UPDATES_PAGE_SIZE}&$skip={skip}&api-version={config['api_version']}"
+        )
+        response = client.get(url)
+        response.raise_for_status()
+        page = response.json().get("value", [])
+        yield page
+        if len(page) < UPDATES_PAGE_SIZE:
+            return
+        skip += len(page)
+
+def get_work_item_changes(config, work_item_id, skip=0):
+    """
+    Fetches the whole /updates history of a work item.
+    Returns:
+        dict: {"count": n, "value": [...]} in the same shape as a single /updates response.
+    """
+    updates = [update for page in iter_work_item_updates(config, work_item_id, skip) for update in page]
+    return {"count": len(updates), "value": updates}
+
+def get_changed_work_items(config, area_path, iteration_path, watermark):
+    """
+    Returns the IDs of work items in the area/iteration changed after the watermark.
+    """
+    url = f"{get_base_url(config)}/{config['organization']}/{config['project']}/_apis/wit/wiql?timePrecision=true&api-version={config['api_version']}"
+    query = {
+        "query": (
+            f"SELECT [System.Id] FROM WorkItems "
+            f"WHERE [System.AreaPath] = '{area_path}' "
+            f"AND [System.IterationPath] = '{iteration_path}' "
+            f"AND [System.ChangedDate] > '{watermark}'"
+        )
+    }
+    response = get_client(config).post(url, json=query)
     response.raise_for_status()
-    return response.json()
+    return [item["id"] for item in response.json().get("workItems", [])]
 
 # -------------------- Work Item History Parsing --------------------
-def parse_changes(change_data):
-    changes = []
-    child_links = []
-    parent_link = None
-    comments = []
-    resolved_date = None
+class HistoryReducer:
+    """
+    Folds /updates entries, one at a time, into the history-derived insight fields.
+
+    Only the folded results are kept, so memory does not grow with the number of field
+    diffs in an item's history. The state is JSON-serialisable (to_state/from_state), which
+    lets the work item store resume folding from where the previous run stopped.
+    Pass keep_raw=True to also keep the per-revision change list that parse_changes returns.
+    """
+
+    def __init__(self, keep_raw=False):
+        self.update_count = 0
+        self.assigned_date = None
+        self.parents_added = []
+        self.children_added = []
+        self.tags_added = {}  # insertion-ordered set
+        self.state_changes = []
+        self.prev_state = None
+        self.comments = []
+        self.resolved_date = None
+        self.child_links = []
+        self.parent_link = None
+        self.changes = [] if keep_raw else None
 
-    for change in change_data.get("value", []):
+    def add(self, change):
         revised_by = change.get("revisedBy", {}).get("displayName", "Unknown")
         revised_date = change.get("revisedDate", "Unknown")
-        change_details = {
-            "revisedBy": revised_by,
-            "revisedDate": revised_date,
-            "fields": []
-        }
+        self.update_count += 1
+        raw_fields = [] if self.changes is not None else None
         for field, diff in change.get("fields", {}).items():
             old_value = diff.get("oldValue")
             new_value = diff.get("newValue")
             if field == "System.History" and new_value:
-                comments.append((revised_date, revised_by, new_value))
-            if field == "System.State" and new_value == "Resolved":
-                resolved_date = revised_date
-            change_details["fields"].append({
-                "field": field,
-                "oldValue": old_value,
-                "newValue": new_value
-            })
-        relations_diff = change.get("relations", {})
-        for rel in relations_diff.get("added", []):
-            if rel.get("rel") == "System.LinkTypes.Hierarchy-Forward":
-                child_links.append(int(rel.get("url", "").split("/")[-1]))
-            if rel.get("rel") == "System.LinkTypes.Hierarchy-Reverse":
-                parent_link = int(rel.get("url", "").split("/")[-1])
-            change_details["fields"].append({
-                "field": "Relation Added",
-                "relType": rel.get("rel", "Unknown"),
-                "url": rel.get("url", "")
-            })
-        if change_details["fields"]:
-            changes.append(change_details)
-    return changes, child_links, parent_link, comments, resolved_date
+                self.comments.append({"date": revised_date, "author": revised_by, "comment": new_value})
+            elif field == "System.AssignedTo" and new_value and self.assigned_date is None:
+                self.assigned_date = revised_date
+            elif field == "System.Tags" and new_value:
+                for tag in str(new_value).split(";"):
+                    self.tags_added[tag.strip()] = None
+            elif field == "System.State":
+                if new_value == "Resolved":
+                    self.resolved_date = revised_date
+                if self.prev_state is not None:
+                    self.state_changes.append({"from": self.prev_state, "to": new_value, "date": revised_date})
+                self.prev_state = new_value
+            if raw_fields is not None:
+                raw_fields.append({"field": field, "oldValue": old_value, "newValue": new_value})
+        for rel in change.get("relations", {}).get("added", []):
+            rel_type = rel.get("rel", "")
+            work_id = rel.get("url", "").split("/")[-1]
+            if "Forward" in rel_type:
+                self.children_added.append(work_id)
+            elif "Reverse" in rel_type:
+                self.parents_added.append(work_id)
+            if rel_type == "System.LinkTypes.Hierarchy-Forward":
+                self.child_links.append(int(work_id))
+            if rel_type == "System.LinkTypes.Hierarchy-Reverse":
+                self.parent_link = int(work_id)
+            if raw_fields is not None:
+                raw_fields.append({"field": "Relation Added", "relType": rel.get("rel", "Unknown"), "url": rel.get("url", "")})
+        if raw_fields:
+            self.changes.append({"revisedBy": revised_by, "revisedDate": revised_date, "fields": raw_fields})
+
+    def add_all(self, changes):
+        for change in changes:
+            self.add(change)
+        return self
+
+    def insight_fields(self, current_tags=""):
+        """
+        Returns the history-derived fields of a sprint insight.
+        Args:
+            current_tags (str): The item's System.Tags, reported when no tags were ever added in history.
+        """
+        return {
+            "assigned_date": self.assigned_date,
+            "parents_link_added": list(self.parents_added),
+            "child_links_added": list(self.children_added),
+            "tags_added": list(self.tags_added) if self.tags_added else current_tags.split(';') if current_tags else [],
+            "comments_added": list(self.comments),
+            "state_changes": list(self.state_changes),
+        }
+
+    def to_state(self):
+        # Lists are copied (and the tag dict flattened) so later folds never alter a saved state
+        return {
+            key: list(value) if isinstance(value, (list, dict)) else value
+            for key, value in vars(self).items() if key != "changes"
+        }
+
+    @classmethod
+    def from_state(cls, state, keep_raw=False):
+        reducer = cls(keep_raw=keep_raw)
+        if state:
+            for key, value in state.items():
+                setattr(reducer, key, value)
+            reducer.tags_added = dict.fromkeys(state.get("tags_added", []))
+            # Copy the lists so the stored state is never mutated
+            for key in ("parents_added", "children_added", "state_changes", "comments", "child_links"):
+                setattr(reducer, key, list(state.get(key, [])))
+        return reducer
+
+def parse_changes(change_data):
+    reducer = HistoryReducer(keep_raw=True).add_all(change_data.get("value", []))
+    comments = [(c["date"], c["author"], c["comment"]) for c in reducer.comments]
+    return reducer.changes, reducer.child_links, reducer.parent_link, comments, reducer.resolved_date
+
+def build_insight(work_item_id, metadata, history):
+    """
+    Builds the sprint insight for one work item from its details and its folded history.
+    Args:
+        work_item_id (int): The work item ID.
+        metadata (dict): The work item details.
+        history (HistoryReducer): The item's history, folded through its latest update.
+    """
+    fields = metadata.get("fields", {})
+    remaining_work = fields.get("Microsoft.VSTS.Scheduling.RemainingWork", 0)
+    completed_work = fields.get("Microsoft.VSTS.Scheduling.CompletedWork", 0)
+    assigned_to = fields.get("System.AssignedTo", {})
+    assigned_to_display = assigned_to.get("displayName") if isinstance(assigned_to, dict) else assigned_to or "Unassigned"
+    history_fields = history.insight_fields(fields.get("System.Tags", ""))
+    insight = {
+        "id": work_item_id,
+        "title": fields.get("System.Title", "N/A"),
+        "type": fields.get("System.WorkItemType", "N/A"),
+        "current_state": fields.get("System.State", "N/A"),
+        "priority": fields.get("Microsoft.VSTS.Common.Priority", "N/A"),
+        "target_date": fields.get("Microsoft.VSTS.Scheduling.TargetDate", "N/A"),
+        "created_date": fields.get("System.CreatedDate", "N/A"),
+        "created_by": fields.get("System.CreatedBy", {}).get("displayName", "Unknown"),
+        "description": fields.get("System.Description", ""),
+        "assigned_to": assigned_to_display,
+        "assigned_date": history_fields["assigned_date"],
+        "original_estimate": fields.get("Microsoft.VSTS.Scheduling.OriginalEstimate", 0),
+        "remaining_work": remaining_work,
+        "effort_time": (completed_work or 0) + (remaining_work or 0),
+        "parents_link_added": history_fields["parents_link_added"],
+        "child_links_added": history_fields["child_links_added"],
+        "tags_added": history_fields["tags_added"],
+        "comments_added": history_fields["comments_added"],
+        "state_changes": history_fields["state_changes"]
+    }
+    if history.changes is not None:
+        insight["history"] = history.changes
+    return insight
+
+def fold_history(stored_entry, pages, keep_raw=False, persist=True):
+    """
+    Resumes a stored history fold with new pages of updates.
+
+    The newest update is held back from the persisted state: ADO only fills in its
+    revisedDate once a newer revision exists, so the next incremental run refetches it.
+    Args:
+        stored_entry (dict): Work item store entry ("history_state", "last_update"), or None.
+        pages (iterable): Pages of updates that follow the stored state, starting with the
+            refetched last update.
+        keep_raw (bool): Keep the raw per-revision change list (only complete for full folds).
+        persist (bool): Compute the state to persist. Without it, that state and the held-back
+            update are None, so no second copy of the folded lists is made.
+    Returns:
+        tuple: (HistoryReducer folded through every update, persisted state, held-back last update).
+    """
+    reducer = HistoryReducer.from_state(stored_entry and stored_entry["history_state"], keep_raw=keep_raw)
+    if not persist:
+        for page in pages:
+            reducer.add_all(page)
+        return reducer, None, None
+    pending = None
+    for page in pages:
+        for update in page:
+            if pending is not None:
+                reducer.add(pending)
+            pending = update
+    state = reducer.to_state()
+    if pending is not None:
+        reducer.add(pending)
+    return reducer, state, pending
+
+def load_work_items(config, work_item_ids, stored_items, history_backend, keep_raw, loads,
+                    watermark=None, persist=True):
+    """
+    Fetches details and folds the history of the given work items, publishing each result to
+    loads as soon as it is ready: every item's details once the batch fetch completes,
+    then each item's history as soon as its fold finishes. Every ID is resolved, with the
+    exception that prevented loading it if need be, even when this function raises.
+    Args:
+        config (dict): Azure DevOps configuration.
+        work_item_ids (list): IDs to load, claimed in loads.
+        stored_items (dict): Work item store entries to resume history folds from.
+        history_backend (str): "updates" or "revisions" (see process_sprint_insights).
+        keep_raw (bool): Keep raw per-revision change lists.
+        loads (WorkItemLoads): Receives the details and fold_history result of each item; its
+            options must match history_backend, keep_raw and persist.
+        watermark (str, optional): asOf time of the run that saved stored_items; lets the
+            revisions backend scan only the revisions made since.
+        persist (bool): Compute the resumable fold state kept in the work item store.
+    """
+    try:
+        if not work_item_ids:
+            return
+        client = get_client(config)
+        # Relations are expanded so PR links can be resolved without refetching each item
+        with metrics.phase("details"):
+            work_item_details = get_work_items_details_batch(config, work_item_ids, expand="Relations")
+        for work_item_id in work_item_ids:
+            try:
+                metadata = work_item_details.get(work_item_id)
+                if metadata is None:
+                    metadata = get_work_item_details(config, work_item_id)
+                loads.set_details(work_item_id, metadata)
+            except Exception as e:
+                loads.set_details(work_item_id, e)
+        if history_backend == "revisions":
+            from revisionHistory import get_updates_from_revisions
+            # Histories of every dirty item come from one reporting scan, starting at the watermark
+            # for stored items and at creation for new ones
+            with metrics.phase("history"):
+                history_by_id = get_updates_from_revisions(config, work_item_ids, work_item_details, stored_items, watermark)
+
+            def fold(work_item_id):
+                entry, updates = history_by_id.pop(work_item_id, (None, []))
+                return fold_history(entry, [updates], keep_raw, persist)
+        else:
+            # Stored items resume their fold from the last update, streaming only the new pages
+            def fold(work_item_id):
+                entry = stored_items.get(str(work_item_id))
+                skip = max(entry["update_count"] - 1, 0) if entry else 0
+                return fold_history(entry, iter_work_item_updates(config, work_item_id, skip), keep_raw, persist)
+        # Details are published above; only the shared copies are kept from here on
+        work_item_details = None
+
+        # Histories are independent per item, so fetch and fold them concurrently
+        def load_history(work_item_id):
+            try:
+                history = fold(work_item_id)
+            except Exception as e:
+                history = e
+            loads.set_result(work_item_id, history)
+
+        with metrics.phase("history"):
+            client.map(load_history, work_item_ids)
+    finally:
+        # Always resolve claims, so readers waiting on these items do not hang if loading failed
+        for work_item_id in work_item_ids:
+            loads.abandon(work_item_id, RuntimeError("work item was not loaded"))
+
+class WorkItemLoads:
+    """
+    Work items being loaded with one set of load options, shared by every target that uses
+    those options. The first target to claim an item loads it; the others wait for that result.
+    Each item's details and history are published separately, so readers can start on the
+    details while histories are still being folded.
+
+    Every claim() registers the caller's interest in each ID it names, and release() gives it
+    up; an item is dropped once no target still needs it, so a run does not hold every item
+    in memory at once. A target claiming an item after it was dropped loads it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = {}
+        self.loaded = 0
+
+    def claim(self, work_item_ids):
+        """Returns the IDs the caller must load itself; the rest are loaded by someone else."""
+        claimed = []
+        with self._lock:
+            for work_item_id in work_item_ids:
+                item = self._items.get(work_item_id)
+                if item is None:
+                    item = self._items[work_item_id] = {"details": Future(), "history": Future(), "readers": 0}
+                    claimed.append(work_item_id)
+                item["readers"] += 1
+            self.loaded += len(claimed)
+        return claimed
+
+    def set_details(self, work_item_id, details):
+        self._items[work_item_id]["details"].set_result(details)
+
+    def set_result(self, work_item_id, history):
+        self._items[work_item_id]["history"].set_result(history)
+
+    def abandon(self, work_item_id, error):
+        """Resolves whatever is still pending for an item with error."""
+        item = self._items.get(work_item_id)
+        if item is None:
+            # Every reader is already done with it
+            return
+        for future in (item["details"], item["history"]):
+            if not future.done():
+                future.set_result(error)
+
+    def details(self, work_item_id):
+        """Returns the item's details, or the exception that prevented loading them."""
+        return self._items[work_item_id]["details"].result()
+
+    def result(self, work_item_id):
+        """Returns the item's (details, fold_history result), or the exception that prevented loading it."""
+        details = self.details(work_item_id)
+        history = self._items[work_item_id]["history"].result()
+        if isinstance(details, Exception):
+            return details
+        if isinstance(history, Exception):
+            return history
+        return details, history
+
+    def release(self, work_item_id):
+        with self._lock:
+            item = self._items[work_item_id]
+            item["readers"] -= 1
+            if item["readers"] == 0:
+                del self._items[work_item_id]
+
+    def __len__(self):
+        return self.loaded
+
+class SharedWorkItems:
+    """
+    Work items loaded during one run, shared by every target so that an item belonging to
+    several targets is fetched once. A fold depends on how it was loaded (history backend,
+    raw history, whether the resumable state was kept), so items are only shared between
+    targets that load them with the same options.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loads = {}
+
+    def for_options(self, **options):
+        """Returns the WorkItemLoads shared by every target loading with these options."""
+        key = tuple(sorted(options.items()))
+        with self._lock:
+            if key not in self._loads:
+                self._loads[key] = WorkItemLoads()
+            return self._loads[key]
+
+    def __len__(self):
+        return sum(len(loads) for loads in self._loads.values())
 
 # -------------------- Main Execution --------------------
-def process_sprint_insights():
+@contextmanager
+def _timed(phase_seconds, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase_seconds[name] += time.perf_counter() - started
+
+@contextmanager
+def _timed_close(context, phase_seconds, name):
+    """
+    Enters context and adds the time its error-free exit takes (the commit of an atomic writer)
+    to phase_seconds[name].
+    """
+    value = context.__enter__()
+    try:
+        yield value
+    except BaseException:
+        if not context.__exit__(*sys.exc_info()):
+            raise
+    else:
+        with _timed(phase_seconds, name):
+            context.__exit__(None, None, None)
+
+def process_sprint_insights(config, incremental=None, history_backend=None, keep_raw=None,
+                            output_dir=None, shared_items=None):
+    """
+    Builds sprint_insights.json and task_efforts.json for the configured area and iteration
+    from a single WIQL query and a single fetch of each work item. Each insight is built and
+    written as soon as its item's history is folded, and the item is then released, so only
+    the details of the dirty items plus the histories still in flight are held in memory.
+    Args:
+        config (dict): Azure DevOps configuration.
+        incremental (bool, optional): Only refetch items changed since the last run, serving the
+            rest from the local work item store. Defaults to the "incremental_sync" config key.
+        history_backend (str, optional): "updates" reads each item's /updates history; "revisions"
+            reads the reporting revisions API in one paged scan, starting at the watermark for stored
+            items and at creation for new ones. Defaults to the "history_backend" config key, or "updates".
+        keep_raw (bool, optional): Add each item's raw per-revision change list as "history".
+            Defaults to the "keep_raw_history" config key. Forces a full sync.
+        output_dir (str, optional): Directory for the outputs and the work item store. Defaults to DATA_DIR.
+        shared_items (SharedWorkItems, optional): Items loaded by other targets in the same run.
+    """
+    if incremental is None:
+        incremental = config.get("incremental_sync", False)
+    if keep_raw is None:
+        keep_raw = config.get("keep_raw_history", False)
+    if keep_raw and incremental:
+        print("[INFO] Raw history needs every revision, running a full sync")
+        incremental = False
+    history_backend = history_backend or config.get("history_backend", "updates")
+    output_dir = output_dir or DATA_DIR
+    store_path = os.path.join(output_dir, "work_item_store.json")
+    area_path = config["area_path"]
+    iteration_path = config["iteration_path"]
     print(f"[DEBUG] Querying work items in iteration: {iteration_path}")
-    work_item_ids = get_area_and_iteration_work_items(area_path, iteration_path)
+    with metrics.phase("wiql"):
+        work_item_ids, as_of = get_area_and_iteration_work_items(config, area_path, iteration_path, with_as_of=True)
     if not work_item_ids:
         print("No work items found for this iteration path.")
         return
-    sprint_insights = []
-    for work_item_id in work_item_ids:
-        try:
-            metadata = get_work_item_details(work_item_id)
-            fields = metadata.get("fields", {})
-            raw_changes = get_work_item_changes(work_item_id)
-            parsed_history, child_links, parent_link, comments, resolved_date = parse_changes(raw_changes)
-            title = fields.get("System.Title", "N/A")
-            work_type = fields.get("System.WorkItemType", "N/A")
-            current_state = fields.get("System.State", "N/A")
-            area = fields.get("System.AreaPath", "N/A")
-            iteration = fields.get("System.IterationPath", "N/A")
-            priority = fields.get("Microsoft.VSTS.Common.Priority", "N/A")
-            target_date = fields.get("Microsoft.VSTS.Scheduling.TargetDate", "N/A")
-            created_date = fields.get("System.CreatedDate", "N/A")
-            created_by = fields.get("System.CreatedBy", {}).get("displayName", "Unknown")
-            description = fields.get("System.Description", "")
-            stack_rank = fields.get("Microsoft.VSTS.Common.StackRank", "N/A")
-            original_estimate = fields.get("Microsoft.VSTS.Scheduling.OriginalEstimate", 0)
-            remaining_work = fields.get("Microsoft.VSTS.Scheduling.RemainingWork", 0)
-            completed_work = fields.get("Microsoft.VSTS.Scheduling.CompletedWork", 0)
-            effort_time = (completed_work or 0) + (remaining_work or 0)
-            tags = fields.get("System.Tags", "")
-            assigned_date = None
-            for change in parsed_history:
-                for field in change["fields"]:
-                    if field["field"] == "System.AssignedTo" and field["newValue"]:
-                        assigned_date = change["revisedDate"]
-                        break
-                if assigned_date:
-                    break
-            parents_added = []
-            children_added = []
-            tags_added = set()
-            state_changes = []
-            prev_state = None
-            for change in parsed_history:
-                for field in change["fields"]:
-                    if field["field"] == "Relation Added":
-                        rel_type = field.get("relType", "")
-                        work_id = field.get("url", "").split("/")[-1]
-                        if "Forward" in rel_type:
-                            children_added.append(work_id)
-                        elif "Reverse" in rel_type:
-                            parents_added.append(work_id)
-                    if field["field"] == "System.Tags" and field["newValue"]:
-                        for tag in str(field["newValue"]).split(";"):
-                            tags_added.add(tag.strip())
-                    if field["field"] == "System.State":
-                        if prev_state is not None:
-                            state_changes.append({
-                                "from": prev_state,
-                                "to": field["newValue"],
-                                "date": change["revisedDate"]
-                            })
-                        prev_state = field["newValue"]
-            assigned_to = fields.get("System.AssignedTo", {})
-            assigned_to_display = assigned_to.get("displayName") if isinstance(assigned_to, dict) else assigned_to or "Unassigned"
-            insight = {
-                "id": work_item_id,
-                "title": title,
-                "type": work_type,
-                "current_state": current_state,
-                "priority": priority,
-                "target_date": target_date,
-                "created_date": created_date,
-                "created_by": created_by,
-                "description": description,
-                "assigned_to": assigned_to_display,
-                "assigned_date": assigned_date,
-                "original_estimate": original_estimate,
-                "remaining_work": remaining_work,
-                "effort_time": effort_time,
-                "parents_link_added": parents_added,
-                "child_links_added": children_added,
-                "tags_added": list(tags_added) if tags_added else tags.split(';') if tags else [],
-                "comments_added": [
-                    {"date": date, "author": author, "comment": comment}
-                    for date, author, comment in comments
-                ],
-                "state_changes": state_changes
-            }
-            sprint_insights.append(insight)
-        except Exception as e:
-            print(f"[ERROR] Could not process work item {work_item_id}: {e}")
-    # After sprint_insights is built, add PR info for closed work items
-    def add_pull_requests_to_closed_items(sprint_insights, config):
-        for item in sprint_insights:
-            if str(item.get("current_state", "")).lower() == "closed":
-                pr_list = get_pull_requests_for_work_item(config, item["id"])
-                item["pull_requests"] = pr_list
-
-    add_pull_requests_to_closed_items(sprint_insights, config)
-    output_path = os.path.join(os.path.dirname(__file__), "sprint_insights.json")
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(sprint_insights, f, indent=2)
+    store = load_store(area_path, iteration_path, store_path) if incremental else {"items": {}}
+    stored_items = store["items"]
+    # The watermark is the asOf time of the previous run's ID query, taken before any details
+    # were read. The newest stored ChangedDate is not safe: details are read in batches over
+    # time, so an edit to an early batch can be older than a later batch's ChangedDate.
+    watermark = store.get("watermark")
+    if incremental and watermark:
+        with metrics.phase("wiql"):
+            changed_ids = set(get_changed_work_items(config, area_path, iteration_path, watermark))
+        dirty_ids = [i for i in work_item_ids if i in changed_ids or str(i) not in stored_items]
+        print(f"[INFO] Incremental sync: {len(dirty_ids)} of {len(work_item_ids)} work items changed since {watermark}")
+    else:
+        dirty_ids = work_item_ids
+    dirty = set(dirty_ids)
+
+    # Items shared with another target in this run are loaded once, by whichever target claims
+    # them first. Loading runs in the background while this thread writes the outputs.
+    if shared_items is None:
+        shared_items = SharedWorkItems()
+    loads = shared_items.for_options(history_backend=history_backend, keep_raw=bool(keep_raw),
+                                     persist=bool(incremental))
+    claimed_ids = loads.claim(dirty_ids)
+    from fetchEfforts import build_task_efforts, write_task_efforts
+    from fetchPRnumber import get_pull_requests_for_work_items
+    from sqliteStore import SqliteStoreWriter
+    from insightText import InsightTextWriter, split_text_fields
+    with ThreadPoolExecutor(max_workers=1) as loader:
+        loading = loader.submit(load_work_items, config, claimed_ids, stored_items, history_backend, keep_raw,
+                                loads, watermark, incremental)
+
+        def get_details(work_item_id):
+            if work_item_id in dirty:
+                details = loads.details(work_item_id)
+                return None if isinstance(details, Exception) else details
+            return stored_items[str(work_item_id)]["details"]
+
+        # PRs of closed items are resolved up front so each insight is complete when built
+        closed_ids, relations_by_id = [], {}
+        for work_item_id in work_item_ids:
+            details = get_details(work_item_id)
+            if details and str(details.get("fields", {}).get("System.State", "")).lower() == "closed":
+                closed_ids.append(work_item_id)
+                # Items stored before relations were expanded have no "relations" key and are fetched in batch
+                if "relations" in details:
+                    relations_by_id[work_item_id] = details["relations"]
+        prs_by_id = get_pull_requests_for_work_items(config, closed_ids, relations_by_id)
+        relations_by_id = None
+
+        output_path = os.path.join(output_dir, "sprint_insights.json")
+        compact = config.get("compact_insights", False)
+        task_efforts = []
+        # Items are built and written one at a time; each phase's time is summed over the items
+        # and recorded as one run, so phase counts stay comparable with the other phases
+        phase_seconds = {"build_insights": 0.0, "json_write": 0.0, "sqlite_write": 0.0}
+        with ExitStack() as outputs:
+            # Compact mode drops indentation and moves descriptions and comments to a side file
+            write_insight = outputs.enter_context(_timed_close(
+                atomic_json_array_writer(output_path, indent=None if compact else 2), phase_seconds, "json_write"))
+            # Indexed copy for consumers that query by state, assignee, type or parent
+            database = outputs.enter_context(_timed_close(
+                SqliteStoreWriter(os.path.join(output_dir, "sprint_insights.db")), phase_seconds, "sqlite_write"))
+            text_writer = outputs.enter_context(_timed_close(
+                InsightTextWriter(output_dir), phase_seconds, "json_write")) if compact else None
+            for work_item_id in work_item_ids:
+                if work_item_id in dirty:
+                    # Waits for this item's fold; later items keep loading meanwhile
+                    loaded = loads.result(work_item_id)
+                    loads.release(work_item_id)
+                    if isinstance(loaded, Exception):
+                        print(f"[ERROR] Could not process work item {work_item_id}: {loaded}")
+                        stored_items.pop(str(work_item_id), None)
+                        continue
+                    metadata, (reducer, history_state, last_update) = loaded
+                    if incremental:
+                        fields = metadata.get("fields", {})
+                        stored_items[str(work_item_id)] = {
+                            "rev": fields.get("System.Rev", metadata.get("rev")),
+                            "changed_date": fields.get("System.ChangedDate"),
+                            "update_count": reducer.update_count,
+                            "details": metadata,
+                            "history_state": history_state,
+                            "last_update": last_update,
+                        }
+                else:
+                    entry = stored_items[str(work_item_id)]
+                    metadata = entry["details"]
+                    reducer = None
+                with _timed(phase_seconds, "build_insights"):
+                    try:
+                        if reducer is None:
+                            # Unchanged item: finish the stored fold with the held-back last update
+                            reducer = HistoryReducer.from_state(entry["history_state"])
+                            if entry["last_update"]:
+                                reducer.add(entry["last_update"])
+                        insight = build_insight(work_item_id, metadata, reducer)
+                    except Exception as e:
+                        print(f"[ERROR] Could not process work item {work_item_id}: {e}")
+                        continue
+                    # Efforts come from the same details, so the two files always describe the same snapshot
+                    task_efforts.extend(build_task_efforts([metadata], tasks_only=True))
+                    if work_item_id in prs_by_id:
+                        insight["pull_requests"] = prs_by_id.pop(work_item_id)
+                with _timed(phase_seconds, "sqlite_write"):
+                    database.add(insight)
+                with _timed(phase_seconds, "json_write"):
+                    if text_writer:
+                        insight, text = split_text_fields(insight)
+                        text_writer.write(text)
+                    write_insight(insight)
+                metadata = reducer = insight = loaded = None
+            # A failed load aborts the outputs, leaving the previous files in place
+            loading.result()
+        for name, seconds in phase_seconds.items():
+            metrics.record_phase(name, seconds)
     print(f"[INFO] Sprint insights written to {output_path}")
+    write_task_efforts(task_efforts, os.path.join(output_dir, "task_efforts.json"))
+
+    if incremental:
+        store["watermark"] = as_of
+        current_ids = {str(i) for i in work_item_ids}
+        for key in list(stored_items):
+            if key not in current_ids:
+                del stored_items[key]
+        with metrics.phase("json_write"):
+            save_store(store, store_path)
     print(f"[INFO] Total work items processed for area '{area_path}' and iteration '{iteration_path}': {len(work_item_ids)}")
 
-# -------------------- Team Capacity --------------------
-# Team capacity logic is now handled by capacity_utils.py
-# If you need to write structured capacity data, just call:
-# write_capacity_to_structured_json(config)
-if __name__ == "__main__":
-    process_sprint_insights()
-    write_capacity_to_structured_json(config)
+# -------------------- CLI --------------------
+def run_insights(config, args, output_dir, shared_items):
+    process_sprint_insights(config, incremental=args.incremental, history_backend=args.history_backend,
+                            keep_raw=args.keep_raw_history, output_dir=output_dir, shared_items=shared_items)
+
+def run_hierarchy(config, args, output_dir, shared_items):
+    from hierarchyGraph import write_hierarchy
+    write_hierarchy(config, output_dir)
+
+def run_capacity(config, args, output_dir, shared_items):
+    from fetchCapacity import write_capacity_to_structured_json
+    write_capacity_to_structured_json(config, os.path.join(output_dir, "capacity_structured.json"))
+
+def run_prs(config, args, output_dir, shared_items):
+    from fetchPRnumber import write_prs_to_structured_json
+    write_prs_to_structured_json(config, os.path.join(output_dir, "sprint_insights.json"),
+                                 os.path.join(output_dir, "pr_structured.json"))
+
+# Stage name -> (runner, output files used to judge freshness). "insights" also writes
+# task_efforts.json, so the two files always come from the same pass.
+# "hierarchy" adds parents and children outside the iteration; it reuses the items of "insights".
+STAGES = {
+    "insights": (run_insights, ["sprint_insights.json", "task_efforts.json"]),
+    "hierarchy": (run_hierarchy, ["hierarchy.json"]),
+    "capacity": (run_capacity, ["capacity_structured.json"]),
+    "prs": (run_prs, ["pr_structured.json"]),
+}
+ALL_STAGES = ["insights", "hierarchy", "capacity", "prs"]
+# Older stage names still accepted on the command line. "efforts" used to refetch the Tasks on
+# its own and rewrite task_efforts.json without sprint_insights.json
+STAGE_ALIASES = {"efforts": "insights"}
+# Stages whose outputs feed sprint_aggregates.json
+AGGREGATE_INPUT_STAGES = ["insights", "capacity"]
+TARGETS_DIR = os.path.join(DATA_DIR, "targets")
+
+def get_targets(config):
+    """
+    Returns the (name, config, output directory) of every team/area/iteration to refresh.
+    Without a "targets" list in config.json the single configured target is refreshed into
+    DATA_DIR, as before. Each entry of "targets" overrides team, area_path and iteration_path
+    (and optionally any other key). The primary target, the entry with "primary": true or else
+    the first one, is written to DATA_DIR; the others go to data/targets/<name>/.
+
+    The MCP tools only read DATA_DIR, so they only ever see the primary target.
+    """
+    targets = config.get("targets")
+    if not targets:
+        return [(config.get("team", "default"), config, DATA_DIR)]
+    primary = next((target for target in targets if target.get("primary")), targets[0])
+    resolved = []
+    for target in targets:
+        target_config = {**config, **target}
+        target_config.pop("targets", None)
+        target_config.pop("primary", None)
+        iteration_name = target_config["iteration_path"].rsplit("\\", 1)[-1]
+        name = target.get("name") or f"{target_config['team']} {iteration_name}"
+        if target is primary:
+            output_dir = DATA_DIR
+        else:
+            output_dir = os.path.join(TARGETS_DIR, re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_"))
+        resolved.append((name, target_config, output_dir))
+    return resolved
 
-    print("[INFO] Processing complete.")
\ No newline at end of file
+def refresh_target(name, config, output_dir, stages, args, max_age, shared_items):
+    """
+    Runs the requested stages for one target and recomputes its aggregates when an input changed.
+    Returns:
+        set: Stages that were actually refreshed.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    refreshed = set()
+    for stage in stages:
+        runner, outputs = STAGES[stage]
+        stage_started = time.perf_counter()
+
+        def run_stage():
+            with metrics.phase(f"stage:{stage}"):
+                runner(config, args, output_dir, shared_items)
+
+        # Concurrent MCP tool calls share one refresh per stage instead of each scraping ADO
+        if coordinated_refresh(
+            run_stage,
+            [os.path.join(output_dir, filename) for filename in outputs],
+            max_age,
+            lock_path=os.path.join(output_dir, f".refresh-{stage}.lock"),
+        ):
+            refreshed.add(stage)
+        if args.timings:
+            print(f"[INFO] Target '{name}' stage '{stage}': {time.perf_counter() - stage_started:.2f} s")
+
+    # Aggregates depend on insights, task efforts and capacity; recompute them once per refresh
+    from sprintAggregates import write_sprint_aggregates
+    if refreshed & set(AGGREGATE_INPUT_STAGES) or not os.path.exists(os.path.join(output_dir, "sprint_aggregates.json")):
+        write_sprint_aggregates(data_dir=output_dir)
+    return refreshed
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Refresh sprint data from Azure DevOps.")
+    parser.add_argument("stages", nargs="*", choices=list(STAGES) + list(STAGE_ALIASES) + ["all"], default="all",
+                        help="Stages to refresh (default: all)")
+    parser.add_argument("--max-age", type=float, default=None,
+                        help="Skip a stage whose output is younger than this many seconds (default: refresh_max_age_seconds from config.json)")
+    parser.add_argument("--force", action="store_true", help="Refresh even if the data is fresh")
+    sync = parser.add_mutually_exclusive_group()
+    sync.add_argument("--incremental", dest="incremental", action="store_true", default=None,
+                      help="Only refetch work items changed since the last run")
+    sync.add_argument("--full", dest="incremental", action="store_false", help="Refetch every work item")
+    parser.add_argument("--history-backend", choices=["updates", "revisions"], default=None,
+                        help="Read history per item (updates) or in bulk from the reporting API (revisions) (default: history_backend from config.json, or updates)")
+    parser.add_argument("--keep-raw-history", action="store_true", default=None,
+                        help="Include each item's raw revision history in sprint_insights.json")
+    parser.add_argument("--target", action="append", dest="targets", metavar="NAME",
+                        help="Only refresh the named target from the targets list in config.json (repeatable)")
+    parser.add_argument("--primary", action="store_true",
+                        help="Only refresh the primary target, the one written to data/ and read by the MCP tools")
+    parser.add_argument("--timings", action="store_true", help="Print startup and per-stage timings")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    config = load_config()
+    max_age = 0 if args.force else args.max_age if args.max_age is not None else config.get("refresh_max_age_seconds", DEFAULT_MAX_AGE_SECONDS)
+    requested = {STAGE_ALIASES.get(s, s) for s in ([args.stages] if isinstance(args.stages, str) else args.stages)}
+    stages = ALL_STAGES if "all" in requested else [s for s in STAGES if s in requested]
+    targets = get_targets(config)
+    if args.targets:
+        targets = [t for t in targets if t[0] in args.targets]
+        if not targets:
+            parser.error(f"no configured target named {', '.join(args.targets)}")
+    if args.primary:
+        targets = [t for t in targets if t[2] == DATA_DIR]
+    if args.timings:
+        print(f"[INFO] Startup: {(started - _import_started) * 1000:.0f} ms imports, {(time.perf_counter() - started) * 1000:.0f} ms config")
+
+    # Targets run side by side on the shared client, so max_concurrency still caps the total
+    # number of requests in flight, and work items that several targets share are loaded once
+    shared_items = SharedWorkItems()
+    refreshed = set()
+    if len(targets) == 1:
+        refreshed = refresh_target(*targets[0], stages, args, max_age, shared_items)
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(targets), config.get("max_concurrent_targets", 4))) as executor:
+            futures = {
+                executor.submit(refresh_target, name, target_config, output_dir, stages, args, max_age, shared_items): name
+                for name, target_config, output_dir in targets
+            }
+            for future, name in futures.items():
+                try:
+                    refreshed |= future.result()
+                except Exception as e:
+                    print(f"[ERROR] Refresh of target '{name}' failed: {e}")
+        print(f"[INFO] Refreshed {len(targets)} targets, {len(shared_items)} work items loaded")
+    if args.timings:
+        print(f"[INFO] Total: {time.perf_counter() - started:.2f} s")
+    # A call served entirely from fresh data keeps the metrics of the last real refresh
+    if refreshed:
+        from refreshMetrics import write_metrics, METRICS_PATH, PROMETHEUS_PATH
+        write_metrics(METRICS_PATH, PROMETHEUS_PATH if config.get("prometheus_metrics") else None)
+    print("[INFO] Processing complete.")
+
+if __name__ == "__main__":
+    main()
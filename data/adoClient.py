@@ -0,0 +1,214 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+from refreshMetrics import metrics
+
+# Status codes worth retrying: throttling plus transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+DEFAULT_BASE_URL = "https://dev.azure.com"
+
+
+class RequestBudgetExceeded(Exception):
+    """Raised when a client has used up its configured request budget."""
+
+
+class AdoClient:
+    """
+    Shared HTTP client for Azure DevOps.
+
+    Keeps one pooled requests.Session for every call, caps the number of requests
+    in flight across all threads, retries throttled and transient failures with
+    exponential backoff (honouring Retry-After and X-RateLimit-* headers), and
+    enforces an optional request budget for the lifetime of the client.
+    """
+
+    def __init__(self, personal_access_token, max_concurrency=8, max_retries=5,
+                 backoff_base=1.0, backoff_max=60.0, request_budget=None, timeout=60):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.request_budget = request_budget
+        self.timeout = timeout
+        self.request_count = 0
+
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth('', personal_access_token)
+        self.session.headers.update({"Content-Type": "application/json"})
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._throttled_until = 0.0
+
+    # -------------------- Requests --------------------
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """
+        Sends a request, retrying on throttling and transient errors.
+        Args:
+            method (str): HTTP method.
+            url (str): Absolute request URL.
+            **kwargs: Passed through to requests.Session.request.
+        Returns:
+            requests.Response: The final response. Callers still call raise_for_status().
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            self._consume_budget()
+            self._wait_for_throttle()
+            try:
+                with self._slots:
+                    started = time.perf_counter()
+                    try:
+                        response = self.session.request(method, url, **kwargs)
+                    except Exception:
+                        metrics.record_request(method, url, time.perf_counter() - started)
+                        raise
+                    metrics.record_request(method, url, time.perf_counter() - started,
+                                           response.status_code, len(response.content))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                metrics.record_retry(method, url)
+                delay = self._backoff_delay(attempt)
+                print(f"[WARN] {method} {url} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            self._record_rate_limit(response)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                return response
+            delay = self._retry_after(response)
+            if delay is None:
+                delay = self._backoff_delay(attempt)
+            if response.status_code == 429:
+                self._throttle_for(delay)
+            metrics.record_retry(method, url)
+            print(f"[WARN] {method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def map(self, fn, items, return_exceptions=False):
+        """
+        Runs fn over items on a thread pool, returning results in input order.
+        Concurrency of the actual HTTP calls is still bounded by max_concurrency,
+        so nested map calls are safe.
+        Args:
+            fn (callable): Function called with each item.
+            items (iterable): Inputs for fn.
+            return_exceptions (bool): Return raised exceptions in place of results instead of re-raising.
+        Returns:
+            list: Results of fn for each item.
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        def call(item):
+            try:
+                return fn(item)
+            except Exception as e:
+                if return_exceptions:
+                    return e
+                raise
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items))) as executor:
+            return list(executor.map(call, items))
+
+    # -------------------- Throttling --------------------
+    def _consume_budget(self):
+        with self._lock:
+            if self.request_budget is not None and self.request_count >= self.request_budget:
+                raise RequestBudgetExceeded(f"Request budget of {self.request_budget} exhausted")
+            self.request_count += 1
+
+    def _wait_for_throttle(self):
+        with self._lock:
+            delay = self._throttled_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _throttle_for(self, delay):
+        metrics.record_throttle_pause(delay)
+        with self._lock:
+            self._throttled_until = max(self._throttled_until, time.monotonic() + delay)
+
+    def _backoff_delay(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _retry_after(self, response):
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return min(self.backoff_max, max(0.0, float(value)))
+        except ValueError:
+            return None
+
+    def _record_rate_limit(self, response):
+        # ADO announces upcoming throttling through X-RateLimit-* headers before it starts
+        # rejecting requests; pause every worker until the advertised reset instead of
+        # running into 429s.
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            if float(remaining) > 0:
+                return
+            delay = float(reset) - time.time()
+        except ValueError:
+            return
+        if delay > 0:
+            self._throttle_for(min(self.backoff_max, delay))
+
+
+def get_base_url(config):
+    """
+    Returns the Azure DevOps root URL, overridable with the "base_url" config key
+    (e.g. to point the fetchers at fakeAdoServer.py).
+    """
+    return config.get("base_url", DEFAULT_BASE_URL).rstrip("/")
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(config):
+    """
+    Returns the AdoClient shared by all fetchers for this access token.
+    Args:
+        config (dict): Azure DevOps configuration. Optional keys: max_concurrency,
+            max_retries, request_budget, request_timeout.
+    Returns:
+        AdoClient: The shared client.
+    """
+    token = config["personal_access_token"]
+    with _clients_lock:
+        client = _clients.get(token)
+        if client is None:
+            client = AdoClient(
+                token,
+                max_concurrency=config.get("max_concurrency", 8),
+                max_retries=config.get("max_retries", 5),
+                request_budget=config.get("request_budget"),
+                timeout=config.get("request_timeout", 60),
+            )
+            _clients[token] = client
+        return client
@@ -0,0 +1,269 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from fakeAdoServer import FakeAdoData, FakeAdoServer
+
+# End-to-end benchmark of the refresh pipeline against fakeAdoServer.py, so fetch regressions
+# show up without a live Azure DevOps org. Each phase runs in a fresh interpreter so its peak
+# RSS is its own; requests, 429s and bytes are counted by the fake server.
+#   python benchmarkRefresh.py --sprint-size 1000 --revision-depth 20 --latency 0.02 --repeat 3
+# --verify instead checks that full, incremental and revisions-backend syncs write the same outputs:
+#   python benchmarkRefresh.py --verify --sprint-size 500 --revision-depth 25
+
+PHASES = ["insights", "efforts", "capacity", "prs"]
+
+def seed_phase_inputs(phase, data, work_dir):
+    """
+    Writes the inputs a phase reads from disk, straight from the fixtures, so every phase can
+    run on its own. "prs" reads sprint_insights.json; only the fields it uses are written.
+    """
+    if phase == "prs":
+        insights = [
+            {"id": work_item_id, "title": item["fields"]["System.Title"], "type": item["fields"]["System.WorkItemType"]}
+            for work_item_id, item in data.items.items()
+            if item["fields"]["System.IterationPath"] == data.iteration_path
+        ]
+        with open(os.path.join(work_dir, "sprint_insights.json"), "w", encoding="utf-8") as f:
+            json.dump(insights, f)
+
+def run_phase(phase, config_path, work_dir):
+    """
+    Runs one phase in this process against the configured server, with every output and
+    cache redirected to work_dir. Each phase gets its own work_dir, so no phase is measured
+    against caches another phase has warmed.
+    Returns:
+        dict: Wall time in seconds and peak RSS in MB (None where unavailable).
+    """
+    import fetchCapacity
+    import fetchPRnumber
+    from fileUtils import load_config
+    config = load_config(config_path)
+    fetchPRnumber.PR_CACHE_PATH = os.path.join(work_dir, "pr_cache.json")
+    fetchCapacity.ITERATION_CACHE_PATH = os.path.join(work_dir, "iteration_cache.json")
+
+    started = time.perf_counter()
+    if phase == "insights":
+        from XsprintADO import process_sprint_insights
+        process_sprint_insights(config, output_dir=work_dir)
+    elif phase == "efforts":
+        from fetchEfforts import fetch_efforts_from_ado
+        fetch_efforts_from_ado(config, os.path.join(work_dir, "task_efforts.json"))
+    elif phase == "capacity":
+        fetchCapacity.write_capacity_to_structured_json(config, os.path.join(work_dir, "capacity_structured.json"))
+    elif phase == "prs":
+        fetchPRnumber.write_prs_to_structured_json(
+            config, os.path.join(work_dir, "sprint_insights.json"), os.path.join(work_dir, "pr_structured.json"))
+    wall = time.perf_counter() - started
+    return {"wall": wall, "peak_rss_mb": peak_rss_mb()}
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_benchmark(args):
+    """
+    Serves a generated sprint and runs every requested phase args.repeat times, each phase
+    and repeat from empty caches.
+    Returns:
+        dict: Per phase, the median wall time, the request/throttle/byte counts of the last
+            repeat and the highest peak RSS.
+    """
+    data = FakeAdoData(args.sprint_size, args.revision_depth, seed=args.seed)
+    server = FakeAdoServer(data, latency=args.latency, throttle_every=args.throttle_every, retry_after=args.retry_after)
+    base_url = server.start()
+    config = data.config(base_url, max_concurrency=args.max_concurrency, history_backend=args.history_backend)
+    print(f"[INFO] Fake Azure DevOps: {len(data.items)} work items x {args.revision_depth} revisions at {base_url}")
+
+    runs = {phase: [] for phase in args.phases}
+    try:
+        for repeat in range(args.repeat):
+            work_dir = tempfile.mkdtemp(prefix="xsprint-bench-")
+            try:
+                config_path = os.path.join(work_dir, "config.json")
+                with open(config_path, "w", encoding="utf-8") as f:
+                    json.dump(config, f)
+                for phase in args.phases:
+                    phase_dir = os.path.join(work_dir, phase)
+                    os.makedirs(phase_dir)
+                    seed_phase_inputs(phase, data, phase_dir)
+                    server.reset_counters()
+                    result_path = os.path.join(work_dir, f"{phase}.result.json")
+                    completed = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), "--run-phase", phase, config_path, phase_dir, result_path],
+                        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=not args.verbose, text=True,
+                    )
+                    if completed.returncode != 0:
+                        print(f"[ERROR] Phase '{phase}' failed:\n{completed.stdout or ''}{completed.stderr or ''}")
+                        raise SystemExit(1)
+                    with open(result_path, "r", encoding="utf-8") as f:
+                        runs[phase].append({**json.load(f), **server.counters()})
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    summary = {}
+    for phase, phase_runs in runs.items():
+        rss = [run["peak_rss_mb"] for run in phase_runs if run["peak_rss_mb"] is not None]
+        summary[phase] = {
+            "wall_seconds": statistics.median(run["wall"] for run in phase_runs),
+            "requests": phase_runs[-1]["requests"],
+            "throttled": phase_runs[-1]["throttled"],
+            "bytes": phase_runs[-1]["bytes"],
+            "peak_rss_mb": max(rss) if rss else None,
+        }
+    return summary
+
+def _edit_fixtures(data):
+    """Edits a few items the way people do mid-sprint, including several edits to one item and a new link."""
+    ids = sorted(i for i, item in data.items.items() if item["fields"]["System.IterationPath"] == data.iteration_path)
+    first, middle, last = ids[0], ids[len(ids) // 2], ids[-1]
+    data.edit(first, {"System.State": "Closed", "System.History": "<div>Done.</div>"})
+    data.edit(middle, {"System.AssignedTo": {"displayName": "Developer 7", "uniqueName": "developer.7@example.com"}})
+    data.edit(middle, {"System.Tags": "perf; verified"})
+    data.edit(middle, {"System.History": "<div>Verified on main.</div>"})
+    # A link edit: the revisions backend only sees it in the current relations
+    data.edit(middle, {}, links=[("System.LinkTypes.Dependency-Forward", last, "Successor")])
+    if "Microsoft.VSTS.Scheduling.RemainingWork" in data.items[last]["fields"]:
+        data.edit(last, {"Microsoft.VSTS.Scheduling.RemainingWork": 0.0, "System.State": "Resolved"})
+    else:
+        data.edit(last, {"System.State": "Resolved"})
+
+def verify(args):
+    """
+    Checks that the history fold gives the same outputs however it is run: a full sync and
+    incremental syncs that resume stored folds, with the updates and the revisions backend.
+    Incremental runs are checked after a round of edits and again with nothing changed, which
+    exercises the held-back last update of each stored fold.
+    Returns:
+        bool: True if every run wrote the same sprint_insights.json and task_efforts.json.
+    """
+    import fetchPRnumber
+    from XsprintADO import process_sprint_insights
+    data = FakeAdoData(args.sprint_size, args.revision_depth, seed=args.seed)
+    server = FakeAdoServer(data)
+    config = data.config(server.start(), max_concurrency=args.max_concurrency)
+    work_dir = tempfile.mkdtemp(prefix="xsprint-verify-")
+    fetchPRnumber.PR_CACHE_PATH = os.path.join(work_dir, "pr_cache.json")
+    incremental_runs = {
+        "incremental updates": ("updates", os.path.join(work_dir, "incremental-updates")),
+        "incremental revisions": ("revisions", os.path.join(work_dir, "incremental-revisions")),
+    }
+
+    def refresh(history_backend, output_dir, incremental):
+        os.makedirs(output_dir, exist_ok=True)
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            process_sprint_insights(config, incremental=incremental, history_backend=history_backend, output_dir=output_dir)
+
+    def read_outputs(output_dir):
+        outputs = {}
+        for filename in ("sprint_insights.json", "task_efforts.json"):
+            with open(os.path.join(output_dir, filename), "r", encoding="utf-8") as f:
+                outputs[filename] = json.load(f)
+        return outputs
+
+    def compare(step, expected, actual):
+        passed = True
+        for name, outputs in actual.items():
+            for filename, items in outputs.items():
+                if items == expected[filename]:
+                    continue
+                passed = False
+                expected_by_id = {item["id"]: item for item in expected[filename]}
+                differing = [item["id"] for item in items if expected_by_id.get(item["id"]) != item]
+                print(f"[ERROR] {step}: {name} {filename} differs from a full sync "
+                      f"({len(items)} vs {len(expected[filename])} items, first differing ID: {differing[:1] or 'order'})")
+        if passed:
+            print(f"[INFO] {step}: {', '.join(actual)} match a full sync")
+        return passed
+
+    try:
+        for history_backend, output_dir in incremental_runs.values():
+            refresh(history_backend, output_dir, incremental=True)
+        passed = True
+        for step in ("after edits", "with nothing changed"):
+            if step == "after edits":
+                # asOf and ChangedDate have millisecond precision; keep the edits after the watermark
+                time.sleep(0.01)
+                _edit_fixtures(data)
+            for history_backend, output_dir in incremental_runs.values():
+                refresh(history_backend, output_dir, incremental=True)
+            full_dirs = {
+                f"full {history_backend}": os.path.join(work_dir, f"full-{history_backend}-{step.replace(' ', '-')}")
+                for history_backend in ("updates", "revisions")
+            }
+            for name, output_dir in full_dirs.items():
+                refresh(name.split()[-1], output_dir, incremental=False)
+            expected = read_outputs(full_dirs.pop("full updates"))
+            actual = {name: read_outputs(output_dir) for name, output_dir in {**full_dirs, **{
+                name: output_dir for name, (_, output_dir) in incremental_runs.items()}}.items()}
+            passed = compare(step, expected, actual) and passed
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return passed
+
+def print_summary(summary):
+    print(f"{'phase':<10} {'wall s':>8} {'requests':>9} {'429s':>6} {'MB recv':>9} {'peak RSS MB':>12}")
+    for phase, result in summary.items():
+        rss = f"{result['peak_rss_mb']:.1f}" if result["peak_rss_mb"] is not None else "n/a"
+        print(f"{phase:<10} {result['wall_seconds']:>8.2f} {result['requests']:>9} {result['throttled']:>6} "
+              f"{result['bytes'] / (1024 * 1024):>9.2f} {rss:>12}")
+
+def main(argv=None):
+    import argparse
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--run-phase"]:
+        phase, config_path, work_dir, result_path = argv[1:5]
+        with open(result_path, "w", encoding="utf-8") as f:
+            json.dump(run_phase(phase, config_path, work_dir), f)
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark the refresh pipeline against a local fake Azure DevOps.")
+    parser.add_argument("phases", nargs="*", choices=PHASES + ["all"], default="all",
+                        help="Phases to run (default: all)")
+    parser.add_argument("--sprint-size", type=int, default=200, help="Work items in the sprint")
+    parser.add_argument("--revision-depth", type=int, default=10, help="Revisions per work item")
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds the fake adds to every response")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every Nth request with 429 (0: never)")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="max_concurrency of the client")
+    parser.add_argument("--history-backend", choices=["updates", "revisions"], default="updates")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per phase; the median wall time is reported")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file, e.g. to compare runs in CI")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of each phase")
+    parser.add_argument("--verify", action="store_true",
+                        help="Instead of timing, check that full, incremental and revisions-backend syncs write the same outputs")
+    args = parser.parse_args(argv)
+    if args.verify:
+        raise SystemExit(0 if verify(args) else 1)
+    args.phases = PHASES if "all" in args.phases else [p for p in PHASES if p in args.phases]
+
+    summary = run_benchmark(args)
+    print_summary(summary)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"parameters": {k: v for k, v in vars(args).items() if k != "json_path"}, "phases": summary}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,541 @@
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+# Offline stand-in for the Azure DevOps REST endpoints the fetchers call, serving generated
+# fixtures. Point a config at it with "base_url" (see benchmarkRefresh.py), or run it directly:
+#   python fakeAdoServer.py --port 8081 --sprint-size 500 --revision-depth 20 --latency 0.02
+
+FIRST_ID = 1000
+SPRINT_START = datetime(2025, 6, 16, tzinfo=timezone.utc)
+SPRINT_DAYS = 14
+LATEST_REVISED_DATE = "9999-01-01T00:00:00Z"
+REVISIONS_PAGE_SIZE = 200
+# Share of Features and User Stories in a sprint; the rest are Tasks
+TYPE_WEIGHTS = [("Feature", 0.1), ("User Story", 0.3), ("Task", 0.6)]
+STATE_FLOW = ["New", "Active", "Resolved", "Closed"]
+PEOPLE = [f"Developer {n}" for n in range(1, 9)]
+TAGS = ["backend", "frontend", "bug-bash", "perf", "docs", "blocked"]
+
+def _timestamp(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%fZ")[:-4] + "Z"
+
+def _identity(name):
+    return {"displayName": name, "uniqueName": f"{name.lower().replace(' ', '.')}@example.com"}
+
+class FakeAdoData:
+    """
+    Generated sprint fixtures: work items with a revision history, their pull requests and
+    the team's iterations and capacities. Generation is seeded, so equal arguments always
+    produce the same sprint.
+    """
+
+    def __init__(self, sprint_size=200, revision_depth=10, organization="fake-org", project="FakeProject",
+                 team="Fake Team", area_path="FakeProject\\Area", iteration_path="FakeProject\\Sprint 1", seed=1):
+        self.organization = organization
+        self.project = project
+        self.team = team
+        self.area_path = area_path
+        self.iteration_path = iteration_path
+        # Features are planned for the release rather than the sprint, so they are the
+        # out-of-iteration parents the hierarchy stage has to find
+        self.release_path = f"{project}\\Release 1"
+        self.random = random.Random(seed)
+        self.items = {}
+        self.updates = {}
+        self.revisions = {}
+        # Relations added per work item and revision, for the relations of /updates
+        self.links_added = {}
+        self.pull_requests = {}
+        types = self._assign_types(sprint_size)
+        self.parents = self._assign_parents(types)
+        self.children = {}
+        for child, parent in self.parents.items():
+            self.children.setdefault(parent, []).append(child)
+        for offset, work_item_type in enumerate(types):
+            work_item_id = FIRST_ID + offset
+            self._generate_item(work_item_id, work_item_type, self.parents.get(work_item_id),
+                                self.children.get(work_item_id, []), max(revision_depth, 1))
+
+    def config(self, base_url, **overrides):
+        """Returns a fetcher configuration pointing at this sprint on the given server URL."""
+        return {
+            "personal_access_token": "fake",
+            "organization": self.organization,
+            "project": self.project,
+            "api_version": "7.1",
+            "team": self.team,
+            "area_path": self.area_path,
+            "iteration_path": self.iteration_path,
+            "base_url": base_url,
+            **overrides,
+        }
+
+    # -------------------- Generation --------------------
+    def _assign_types(self, sprint_size):
+        types = []
+        for work_item_type, weight in TYPE_WEIGHTS:
+            types += [work_item_type] * round(sprint_size * weight)
+        types = (types + ["Task"] * sprint_size)[:sprint_size]
+        return types
+
+    def _assign_parents(self, types):
+        by_type = {}
+        for offset, work_item_type in enumerate(types):
+            by_type.setdefault(work_item_type, []).append(FIRST_ID + offset)
+        parents = {}
+        for child_type, parent_type in (("User Story", "Feature"), ("Task", "User Story")):
+            if by_type.get(parent_type):
+                for work_item_id in by_type.get(child_type, []):
+                    parents[work_item_id] = self.random.choice(by_type[parent_type])
+        return parents
+
+    def _relation(self, rel, work_item_id, name=None):
+        return {
+            "rel": rel,
+            "url": f"https://dev.azure.com/{self.organization}/_apis/wit/workItems/{work_item_id}",
+            "attributes": {"isLocked": False, "name": name or ("Parent" if rel.endswith("Reverse") else "Child")},
+        }
+
+    def _generate_item(self, work_item_id, work_item_type, parent_id, children, revision_depth):
+        rnd = self.random
+        created = SPRINT_START + timedelta(minutes=rnd.randint(0, 24 * 60))
+        step = timedelta(seconds=(SPRINT_DAYS - 1) * 24 * 3600 / revision_depth)
+        creator = rnd.choice(PEOPLE)
+        snapshot = {
+            "System.Id": work_item_id,
+            "System.AreaPath": self.area_path,
+            "System.IterationPath": self.release_path if work_item_type == "Feature" else self.iteration_path,
+            "System.TeamProject": self.project,
+            "System.WorkItemType": work_item_type,
+            "System.State": "New",
+            "System.Title": f"{work_item_type} {work_item_id}: generated work item",
+            "System.CreatedDate": _timestamp(created),
+            "System.CreatedBy": _identity(creator),
+            "System.Description": f"<div>Generated description for {work_item_id}.</div>" * 4,
+            "Microsoft.VSTS.Common.Priority": rnd.randint(1, 4),
+            "Microsoft.VSTS.Common.StackRank": rnd.random() * 1e9,
+        }
+        if work_item_type == "Task":
+            estimate = float(rnd.choice([0, 2, 4, 8, 16]))
+            if estimate:
+                snapshot["Microsoft.VSTS.Scheduling.OriginalEstimate"] = estimate
+            snapshot["Microsoft.VSTS.Scheduling.RemainingWork"] = estimate
+            snapshot["Microsoft.VSTS.Scheduling.CompletedWork"] = 0.0
+        else:
+            snapshot["Microsoft.VSTS.Scheduling.TargetDate"] = _timestamp(SPRINT_START + timedelta(days=SPRINT_DAYS))
+
+        relations = ([self._relation("System.LinkTypes.Hierarchy-Reverse", parent_id)] if parent_id else []) + [
+            self._relation("System.LinkTypes.Hierarchy-Forward", child) for child in children
+        ]
+        snapshots = []
+        for rev in range(1, revision_depth + 1):
+            changed = created + step * (rev - 1)
+            snapshot = dict(snapshot)
+            snapshot.pop("System.History", None)
+            if rev > 1:
+                self._mutate(snapshot, rev, revision_depth)
+            snapshot["System.Rev"] = rev
+            snapshot["System.ChangedDate"] = _timestamp(changed)
+            snapshot["System.ChangedBy"] = _identity(creator if rev == 1 else rnd.choice(PEOPLE))
+            snapshots.append(snapshot)
+
+        final = dict(snapshots[-1])
+        final.pop("System.History", None)
+        if final["System.State"] == "Closed" and rnd.random() < 0.7:
+            pr_id = len(self.pull_requests) + 1
+            repo_id = f"repo-{pr_id % 3 + 1}"
+            self.pull_requests[(repo_id, pr_id)] = {
+                "repository": {"id": repo_id, "name": f"Repository {repo_id[-1]}"},
+                "pullRequestId": pr_id,
+                "status": "completed" if rnd.random() < 0.8 else "active",
+                "createdBy": _identity(final["System.AssignedTo"]["displayName"] if "System.AssignedTo" in final else creator),
+                "creationDate": final["System.ChangedDate"],
+                "closedDate": final["System.ChangedDate"],
+                "title": f"Change for work item {work_item_id}",
+                "sourceRefName": f"refs/heads/users/dev/{work_item_id}",
+                "targetRefName": "refs/heads/main",
+            }
+            relations.append({
+                "rel": "ArtifactLink",
+                "url": f"vstfs:///Git/PullRequestId/{self.project}%2F{repo_id}%2F{pr_id}",
+                "attributes": {"name": "Pull Request"},
+            })
+
+        self.items[work_item_id] = {"id": work_item_id, "rev": revision_depth, "fields": final, "relations": relations}
+        self.revisions[work_item_id] = [{"id": work_item_id, "rev": s["System.Rev"], "fields": s} for s in snapshots]
+        self.links_added[work_item_id] = {1: relations}
+        self.updates[work_item_id] = self._to_updates(work_item_id, snapshots)
+
+    def _mutate(self, snapshot, rev, revision_depth):
+        rnd = self.random
+        # Move the state forward about once per quarter of the history
+        progress = STATE_FLOW[min(len(STATE_FLOW) - 1, (rev * len(STATE_FLOW)) // (revision_depth + 1))]
+        choice = rnd.random()
+        if progress != snapshot["System.State"] and choice < 0.6:
+            snapshot["System.State"] = progress
+        elif "System.AssignedTo" not in snapshot or choice < 0.7:
+            snapshot["System.AssignedTo"] = _identity(rnd.choice(PEOPLE))
+        elif choice < 0.8:
+            tags = set(filter(None, snapshot.get("System.Tags", "").split("; ")))
+            tags.add(rnd.choice(TAGS))
+            snapshot["System.Tags"] = "; ".join(sorted(tags))
+        elif choice < 0.9 and "Microsoft.VSTS.Scheduling.RemainingWork" in snapshot:
+            remaining = snapshot["Microsoft.VSTS.Scheduling.RemainingWork"]
+            burnt = min(remaining, float(rnd.randint(1, 4)))
+            snapshot["Microsoft.VSTS.Scheduling.RemainingWork"] = remaining - burnt
+            snapshot["Microsoft.VSTS.Scheduling.CompletedWork"] += burnt
+        else:
+            snapshot["System.History"] = f"<div>Status update {rev}: progressing as planned.</div>"
+
+    def edit(self, work_item_id, fields, changed_by="Developer 1", links=None):
+        """
+        Adds a revision to a work item, changed now, as if someone edited it in ADO.
+        Args:
+            work_item_id (int): The work item to edit.
+            fields (dict): Field reference names and their new values.
+            changed_by (str): Display name of the editor.
+            links (list, optional): (link type, target ID, name) of links added to this item only;
+                the linked item and the hierarchy returned by link queries are left as they are.
+        """
+        snapshots = [revision["fields"] for revision in self.revisions[work_item_id]]
+        snapshot = dict(snapshots[-1])
+        snapshot.pop("System.History", None)
+        snapshot.update(fields)
+        snapshot["System.Rev"] = len(snapshots) + 1
+        snapshot["System.ChangedDate"] = _timestamp(datetime.now(timezone.utc))
+        snapshot["System.ChangedBy"] = _identity(changed_by)
+        snapshots.append(snapshot)
+        final = dict(snapshot)
+        final.pop("System.History", None)
+        added = [self._relation(rel, target, name) for rel, target, name in links or []]
+        item = self.items[work_item_id]
+        self.items[work_item_id] = {**item, "rev": snapshot["System.Rev"], "fields": final,
+                                    "relations": item["relations"] + added}
+        self.revisions[work_item_id] = self.revisions[work_item_id] + [
+            {"id": work_item_id, "rev": snapshot["System.Rev"], "fields": snapshot}]
+        if added:
+            self.links_added[work_item_id] = {**self.links_added[work_item_id], snapshot["System.Rev"]: added}
+        self.updates[work_item_id] = self._to_updates(work_item_id, snapshots)
+
+    def _to_updates(self, work_item_id, snapshots):
+        updates = []
+        previous = {}
+        for index, snapshot in enumerate(snapshots):
+            fields = {}
+            for field, value in snapshot.items():
+                if field == "System.History":
+                    fields[field] = {"newValue": value}
+                elif previous.get(field) != value:
+                    fields[field] = {"oldValue": previous[field], "newValue": value} if field in previous else {"newValue": value}
+            update = {
+                "id": index + 1,
+                "workItemId": work_item_id,
+                "rev": snapshot["System.Rev"],
+                "revisedBy": snapshot["System.ChangedBy"],
+                "revisedDate": snapshots[index + 1]["System.ChangedDate"] if index + 1 < len(snapshots) else LATEST_REVISED_DATE,
+                "fields": fields,
+            }
+            relations = self.links_added[work_item_id].get(snapshot["System.Rev"])
+            if relations:
+                update["relations"] = {"added": relations}
+            updates.append(update)
+            previous = snapshot
+        return updates
+
+    def iterations(self):
+        sprints = []
+        for back in range(3, -1, -1):
+            start = SPRINT_START - timedelta(days=SPRINT_DAYS * back)
+            name = self.iteration_path if back == 0 else f"{self.iteration_path} (-{back})"
+            sprints.append({
+                "id": f"00000000-0000-0000-0000-00000000000{back}",
+                "name": name.rsplit("\\", 1)[-1],
+                "path": name,
+                "attributes": {
+                    "startDate": _timestamp(start),
+                    "finishDate": _timestamp(start + timedelta(days=SPRINT_DAYS - 3)),
+                    "timeFrame": "current" if back == 0 else "past",
+                },
+            })
+        return sprints
+
+    def capacities(self):
+        members = []
+        for n, person in enumerate(PEOPLE):
+            days_off = []
+            if n % 3 == 0:
+                start = SPRINT_START + timedelta(days=n % 5)
+                days_off.append({"start": _timestamp(start), "end": _timestamp(start + timedelta(days=n % 2))})
+            members.append({
+                "teamMember": _identity(person),
+                "activities": [{"name": "Development", "capacityPerDay": 6 - n % 3}],
+                "daysOff": days_off,
+            })
+        return {"teamMembers": members}
+
+    # -------------------- Queries --------------------
+    def query(self, wiql):
+        """Evaluates the WIQL shapes the fetchers send: area/iteration, type and ChangedDate filters."""
+        area = re.search(r"\[System\.AreaPath\] = '([^']*)'", wiql)
+        iteration = re.search(r"\[System\.IterationPath\] = '([^']*)'", wiql)
+        work_item_ids = re.search(r"\[System\.Id\] IN \(([^)]*)\)", wiql)
+        work_item_type = re.search(r"\[System\.WorkItemType\] = '([^']*)'", wiql)
+        changed_after = re.search(r"\[System\.ChangedDate\] > '([^']*)'", wiql)
+        wanted = {int(i) for i in work_item_ids.group(1).split(",")} if work_item_ids else None
+        ids = []
+        for work_item_id, item in self.items.items():
+            fields = item["fields"]
+            if wanted is not None and work_item_id not in wanted:
+                continue
+            if area and fields["System.AreaPath"] != area.group(1):
+                continue
+            if iteration and fields["System.IterationPath"] != iteration.group(1):
+                continue
+            if work_item_type and fields["System.WorkItemType"] != work_item_type.group(1):
+                continue
+            if changed_after and fields["System.ChangedDate"] <= changed_after.group(1):
+                continue
+            ids.append(work_item_id)
+        return ids
+
+    def query_links(self, wiql):
+        """
+        Evaluates a hierarchy WorkItemLinks query: Forward links in Recursive mode return the
+        tree below each source item, Reverse links return each source item's parent.
+        """
+        sources = self.query(wiql)
+        relations = []
+        if "Hierarchy-Forward" in wiql:
+            def descend(parent):
+                for child in self.children.get(parent, []):
+                    relations.append({"rel": "System.LinkTypes.Hierarchy-Forward", "source": {"id": parent}, "target": {"id": child}})
+                    descend(child)
+            for source in sources:
+                relations.append({"rel": None, "source": None, "target": {"id": source}})
+                descend(source)
+        else:
+            for source in sources:
+                relations.append({"rel": None, "source": None, "target": {"id": source}})
+                if source in self.parents:
+                    relations.append({"rel": "System.LinkTypes.Hierarchy-Reverse", "source": {"id": source},
+                                      "target": {"id": self.parents[source]}})
+        return relations
+
+    def work_item(self, work_item_id, fields=None, expand_relations=False):
+        item = self.items.get(work_item_id)
+        if item is None:
+            return None
+        result = {"id": item["id"], "rev": item["rev"], "fields": item["fields"]}
+        if fields:
+            result["fields"] = {k: v for k, v in item["fields"].items() if k in fields}
+        if expand_relations:
+            result["relations"] = item["relations"]
+        return result
+
+class FakeAdoServer(ThreadingHTTPServer):
+    """
+    HTTP server for FakeAdoData. Adds a fixed latency to every response, and with
+    throttle_every=N answers every Nth request with 429 and a Retry-After header.
+    Counts requests, throttled responses and response bytes for benchmarks.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, data, host="127.0.0.1", port=0, latency=0.0, throttle_every=0, retry_after=1):
+        super().__init__((host, port), FakeAdoHandler)
+        self.data = data
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.reset_counters()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_counters(self):
+        with self.lock:
+            self.request_count = 0
+            self.throttled_count = 0
+            self.bytes_sent = 0
+
+    def counters(self):
+        with self.lock:
+            return {"requests": self.request_count, "throttled": self.throttled_count, "bytes": self.bytes_sent}
+
+    def start(self):
+        """Serves on a background thread and returns the base URL."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.base_url
+
+class FakeAdoHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive, like the pooled session used against ADO; without
+    # TCP_NODELAY the separate header and body writes stall on delayed ACKs
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    ROUTES = [
+        ("POST", re.compile(r"/_apis/wit/wiql$", re.I), "wiql"),
+        ("POST", re.compile(r"/_apis/wit/workitemsbatch$", re.I), "workitems_batch"),
+        ("GET", re.compile(r"/_apis/wit/workitems$", re.I), "workitems_list"),
+        ("GET", re.compile(r"/_apis/wit/workitems/(\d+)$", re.I), "workitem"),
+        ("GET", re.compile(r"/_apis/wit/workitems/(\d+)/updates$", re.I), "updates"),
+        ("GET", re.compile(r"/_apis/wit/reporting/workitemrevisions$", re.I), "revisions"),
+        ("GET", re.compile(r"/_apis/work/teamsettings/iterations$", re.I), "iterations"),
+        ("GET", re.compile(r"/_apis/work/teamsettings/iterations/([^/]+)/capacities$", re.I), "capacities"),
+        ("GET", re.compile(r"/_apis/git/repositories/([^/]+)/pullrequests/(\d+)$", re.I), "pull_request"),
+    ]
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        url = urlparse(self.path)
+        path = unquote(url.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with server.lock:
+            server.request_count += 1
+            throttled = server.throttle_every and server.request_count % server.throttle_every == 0
+            if throttled:
+                server.throttled_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if throttled:
+            self._send(429, {"message": "Request was blocked due to exceeding usage of resource."},
+                       {"Retry-After": str(server.retry_after)})
+            return
+        for route_method, pattern, handler in self.ROUTES:
+            match = pattern.search(path)
+            if match and route_method == method:
+                status, payload = getattr(self, f"_handle_{handler}")(match, params, body)
+                self._send(status, payload)
+                return
+        self._send(404, {"message": f"No fake for {method} {path}"})
+
+    def _send(self, status, payload, headers=None):
+        content = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+        with self.server.lock:
+            self.server.bytes_sent += len(content)
+
+    # -------------------- Endpoints --------------------
+    def _handle_wiql(self, match, params, body):
+        if "FROM WorkItemLinks" in body.get("query", ""):
+            relations = self.server.data.query_links(body["query"])
+            return 200, {"queryType": "tree", "asOf": _timestamp(datetime.now(timezone.utc)), "workItemRelations": relations}
+        # asOf is taken before the query is evaluated, like ADO's snapshot time
+        as_of = _timestamp(datetime.now(timezone.utc))
+        ids = self.server.data.query(body.get("query", ""))
+        return 200, {"queryType": "flat", "asOf": as_of, "workItems": [{"id": i, "url": ""} for i in ids]}
+
+    def _handle_workitems_batch(self, match, params, body):
+        if body.get("fields") and body.get("$expand"):
+            return 400, {"message": "The expand parameter can not be used with the fields parameter."}
+        expand = str(body.get("$expand", "")).lower() in ("relations", "all")
+        items = [self.server.data.work_item(i, body.get("fields"), expand) for i in body.get("ids", [])]
+        if body.get("errorPolicy", "").lower() != "omit" and None in items:
+            return 404, {"message": "Work item does not exist."}
+        return 200, {"count": len(items), "value": items}
+
+    def _handle_workitems_list(self, match, params, body):
+        fields = params["fields"].split(",") if params.get("fields") else None
+        expand = params.get("$expand", "").lower() in ("relations", "all")
+        items = [self.server.data.work_item(int(i), fields, expand) for i in params.get("ids", "").split(",") if i]
+        items = [item for item in items if item]
+        return 200, {"count": len(items), "value": items}
+
+    def _handle_workitem(self, match, params, body):
+        expand = params.get("$expand", "").lower() in ("relations", "all")
+        item = self.server.data.work_item(int(match.group(1)), expand_relations=expand)
+        if item is None:
+            return 404, {"message": "Work item does not exist."}
+        return 200, item
+
+    def _handle_updates(self, match, params, body):
+        updates = self.server.data.updates.get(int(match.group(1)))
+        if updates is None:
+            return 404, {"message": "Work item does not exist."}
+        skip, top = int(params.get("$skip", 0)), int(params.get("$top", 200))
+        page = updates[skip:skip + top]
+        return 200, {"count": len(page), "value": page}
+
+    def _handle_revisions(self, match, params, body):
+        fields = params["fields"].split(",") if params.get("fields") else None
+        types = set(params["types"].split(",")) if params.get("types") else None
+        start_date_time = params.get("startDateTime")
+        revisions = [
+            rev for item_revisions in self.server.data.revisions.values() for rev in item_revisions
+            if (types is None or rev["fields"]["System.WorkItemType"] in types)
+            and (start_date_time is None or rev["fields"]["System.ChangedDate"] > start_date_time)
+        ]
+        start = int(params.get("continuationToken", 0))
+        page = [
+            {"id": rev["id"], "rev": rev["rev"],
+             "fields": {k: v for k, v in rev["fields"].items() if not fields or k in fields}}
+            for rev in revisions[start:start + REVISIONS_PAGE_SIZE]
+        ]
+        end = start + len(page)
+        return 200, {"values": page, "continuationToken": str(end), "isLastBatch": end >= len(revisions)}
+
+    def _handle_iterations(self, match, params, body):
+        iterations = self.server.data.iterations()
+        return 200, {"count": len(iterations), "value": iterations}
+
+    def _handle_capacities(self, match, params, body):
+        return 200, self.server.data.capacities()
+
+    def _handle_pull_request(self, match, params, body):
+        pr = self.server.data.pull_requests.get((match.group(1), int(match.group(2))))
+        if pr is None:
+            return 404, {"message": "Pull request not found."}
+        return 200, pr
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve generated Azure DevOps fixtures for offline runs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--sprint-size", type=int, default=200, help="Work items in the sprint")
+    parser.add_argument("--revision-depth", type=int, default=10, help="Revisions per work item")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every Nth request with 429 (0: never)")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    data = FakeAdoData(args.sprint_size, args.revision_depth, seed=args.seed)
+    server = FakeAdoServer(data, args.host, args.port, args.latency, args.throttle_every, args.retry_after)
+    print(f"[INFO] Fake Azure DevOps serving {len(data.items)} work items at {server.base_url}")
+    print("[INFO] Config: " + json.dumps(data.config(server.base_url)))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,139 @@
-import requests
-from requests.auth import HTTPBasicAuth
 import json
-from datetime import datetime, timedelta
+import threading
+from datetime import date, datetime, timedelta
 import os
+from adoClient import DEFAULT_BASE_URL, get_base_url, get_client
+from fileUtils import atomic_write_json
+from refreshMetrics import metrics
 
-def get_iteration_id_and_dates(organization, project, team, api_version, auth, headers, iteration_path):
-    url = f"https://dev.azure.com/{organization}/{project}/{team}/_apis/work/teamsettings/iterations?api-version={api_version}"
-    response = requests.get(url, auth=auth, headers=headers)
+ITERATION_CACHE_PATH = os.path.join(os.path.dirname(__file__), "iteration_cache.json")
+_iteration_cache_lock = threading.Lock()
+
+# -------------------- Working days --------------------
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value[:10], "%Y-%m-%d").date()
+
+def _weekdays_before(day):
+    # Mon-Fri days in [epoch, day), where the epoch 0001-01-01 is a Monday
+    weeks, remainder = divmod(day.toordinal() - 1, 7)
+    return weeks * 5 + min(remainder, 5)
+
+def parse_holidays(holidays):
+    """
+    Returns the set of holiday dates from an iterable of "YYYY-MM-DD" strings or dates.
+    """
+    return {_to_date(day) for day in holidays or []}
+
+def count_working_days(start, end, holidays=None):
+    """
+    Counts Monday-Friday days from start to end inclusive, minus holidays that fall on a
+    weekday, in constant time regardless of the length of the range.
+    Args:
+        start (str | date): First day; ISO strings may carry a time part, which is ignored.
+        end (str | date): Last day.
+        holidays (set, optional): Dates that are not worked (see parse_holidays).
+    Returns:
+        int: Number of working days, 0 when end is before start.
+    """
+    start, end = _to_date(start), _to_date(end)
+    if end < start:
+        return 0
+    count = _weekdays_before(end + timedelta(days=1)) - _weekdays_before(start)
+    if holidays:
+        count -= sum(1 for day in holidays if start <= day <= end and day.weekday() < 5)
+    return count
+
+# -------------------- Iterations --------------------
+def load_iteration_cache(cache_path=None):
+    cache_path = cache_path or ITERATION_CACHE_PATH
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Ignoring unreadable iteration cache {cache_path}: {e}")
+        return {}
+
+def get_iteration_id_and_dates(organization, project, team, api_version, client, iteration_path, cache_path=None,
+                               base_url=DEFAULT_BASE_URL):
+    """
+    Returns (id, startDate, finishDate) of a team iteration, or (None, None, None) if the team
+    has no such iteration. Iterations do not change once their dates are set, so they are kept
+    in iteration_cache.json and the team iteration list is only downloaded on a cache miss.
+    """
+    cache_path = cache_path or ITERATION_CACHE_PATH
+    team_key = f"{organization}/{project}/{team}"
+    cached = load_iteration_cache(cache_path).get(team_key, {}).get(iteration_path)
+    if cached:
+        return cached["id"], cached["startDate"], cached["finishDate"]
+
+    url = f"{base_url}/{organization}/{project}/{team}/_apis/work/teamsettings/iterations?api-version={api_version}"
+    response = client.get(url)
     response.raise_for_status()
-    iterations = response.json().get("value", [])
-    for it in iterations:
-        if it.get("path") == iteration_path:
-            return it.get("id"), it.get("attributes", {}).get("startDate"), it.get("attributes", {}).get("finishDate")
-    return None, None, None
+    iterations = {
+        it.get("path"): {
+            "id": it.get("id"),
+            "startDate": it.get("attributes", {}).get("startDate"),
+            "finishDate": it.get("attributes", {}).get("finishDate"),
+        }
+        for it in response.json().get("value", [])
+    }
+    # Iterations without dates yet may still be scheduled, so only dated ones are cached
+    dated = {path: it for path, it in iterations.items() if it["startDate"] and it["finishDate"]}
+    if dated:
+        with _iteration_cache_lock:
+            cache = load_iteration_cache(cache_path)
+            cache.setdefault(team_key, {}).update(dated)
+            atomic_write_json(cache_path, cache, indent=2)
+    found = iterations.get(iteration_path)
+    if found is None:
+        return None, None, None
+    return found["id"], found["startDate"], found["finishDate"]
 
-def write_capacity_to_structured_json(config):
-    personal_access_token = config["personal_access_token"]
+# -------------------- Capacity --------------------
+def get_capacity(config, team, iteration_path, holidays=None):
+    """
+    Builds the structured capacity of one team iteration.
+    Args:
+        config (dict): Azure DevOps configuration.
+        team (str): Team name.
+        iteration_path (str): Iteration path of the team.
+        holidays (set, optional): Dates excluded from working days and days off.
+    Returns:
+        dict: {"totalWorkingDays", "users"} as written to capacity_structured.json, or None
+            when the team has no such iteration.
+    """
     organization = config["organization"]
     project = config["project"]
     api_version = config["api_version"]
-    iteration_path = config["iteration_path"]
-    team = config["team"]
-    auth = HTTPBasicAuth('', personal_access_token)
-    headers = {"Content-Type": "application/json"}
+    client = get_client(config)
 
-    iteration_id, iteration_start, iteration_end = get_iteration_id_and_dates(
-        organization, project, team, api_version, auth, headers, iteration_path)
+    with metrics.phase("iterations"):
+        iteration_id, iteration_start, iteration_end = get_iteration_id_and_dates(
+            organization, project, team, api_version, client, iteration_path, base_url=get_base_url(config))
     if not iteration_id:
-        return
+        return None
 
-    # Calculate total working days (excluding weekends)
     total_working_days = 0
     if iteration_start and iteration_end:
-        start = datetime.strptime(iteration_start[:10], "%Y-%m-%d")
-        end = datetime.strptime(iteration_end[:10], "%Y-%m-%d")
-        delta = end - start
-        for i in range(delta.days + 1):
-            day = start + timedelta(days=i)
-            if day.weekday() < 5:  # Monday=0, Sunday=6
-                total_working_days += 1
+        total_working_days = count_working_days(iteration_start, iteration_end, holidays)
 
     # Get capacities for this iteration (force API version 7.0)
-    cap_url = f"https://dev.azure.com/{organization}/{project}/{team}/_apis/work/teamsettings/iterations/{iteration_id}/capacities?api-version=7.0"
-    cap_response = requests.get(cap_url, auth=auth, headers=headers)
-    cap_response.raise_for_status()
-    capacities = cap_response.json().get("teamMembers", [])
+    cap_url = f"{get_base_url(config)}/{organization}/{project}/{team}/_apis/work/teamsettings/iterations/{iteration_id}/capacities?api-version=7.0"
+    with metrics.phase("capacity"):
+        cap_response = client.get(cap_url)
+        cap_response.raise_for_status()
+        capacities = cap_response.json().get("teamMembers", [])
     structured = []
     for cap in capacities:
         user = cap.get("teamMember", {}).get("displayName", "Unknown")
         activities = cap.get("activities", [])
-        days_off = cap.get("daysOff", [])
-        num_days_off = 0
-        for d in days_off:
-            start = datetime.strptime(d["start"][:10], "%Y-%m-%d")
-            end = datetime.strptime(d["end"][:10], "%Y-%m-%d")
-            for i in range((end - start).days + 1):
-                day = start + timedelta(days=i)
-                if day.weekday() < 5:
-                    num_days_off += 1
+        num_days_off = sum(count_working_days(d["start"], d["end"], holidays) for d in cap.get("daysOff", []))
         structured.append({
             "name": user,
             "capacityPerDay": [
@@ -65,12 +141,43 @@ def write_capacity_to_structured_json(config):
             ],
             "numberOfDaysOff": num_days_off
         })
-    output = {
+    return {
         "totalWorkingDays": total_working_days,
         "users": structured
     }
-    output_path = os.path.join(os.path.dirname(__file__), "capacity_structured.json")
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=2)
+
+def get_capacities(config, targets):
+    """
+    Builds the structured capacity of many team iterations concurrently, e.g. every team of a
+    release or a team's historical sprints for trend reporting.
+    Args:
+        config (dict): Azure DevOps configuration. Optional key "holidays": list of "YYYY-MM-DD"
+            dates that are not worked.
+        targets (list): (team, iteration_path) pairs.
+    Returns:
+        dict: Mapping of (team, iteration_path) to its capacity (see get_capacity). Targets whose
+            iteration does not exist or could not be fetched are omitted.
+    """
+    holidays = parse_holidays(config.get("holidays"))
+    targets = list(dict.fromkeys(targets))
+    results = get_client(config).map(
+        lambda target: get_capacity(config, target[0], target[1], holidays), targets, return_exceptions=True)
+    capacities = {}
+    for (team, iteration_path), capacity in zip(targets, results):
+        if isinstance(capacity, Exception):
+            print(f"[ERROR] Could not fetch capacity of team '{team}' for {iteration_path}: {capacity}")
+        elif capacity is None:
+            print(f"[WARN] Team '{team}' has no iteration {iteration_path}")
+        else:
+            capacities[(team, iteration_path)] = capacity
+    return capacities
+
+def write_capacity_to_structured_json(config, output_path=None):
+    output = get_capacity(config, config["team"], config["iteration_path"], parse_holidays(config.get("holidays")))
+    if output is None:
+        return
+    output_path = output_path or os.path.join(os.path.dirname(__file__), "capacity_structured.json")
+    with metrics.phase("json_write"):
+        atomic_write_json(output_path, output, indent=2)
     print(f"[INFO] Structured capacity data written to {output_path}")
-    print(f"[INFO] Total working days in iteration: {total_working_days}")
+    print(f"[INFO] Total working days in iteration: {output['totalWorkingDays']}")
@@ -1,14 +1,15 @@
 import os
 import json
-import requests
+from adoClient import get_base_url, get_client
+from fileUtils import atomic_write_json, load_config
+from refreshMetrics import metrics
 
-def fetch_efforts_from_ado(config):
+def fetch_efforts_from_ado(config, output_path=None):
     personal_access_token = config["personal_access_token"]
     organization = config["organization"]
     project = config["project"]
     api_version = config.get("api_version", "7.1-preview")
-    auth = ("", personal_access_token)
-    headers = {"Content-Type": "application/json"}
+    client = get_client(config)
     
     # Query for all tasks in the iteration/area
     wiql = {
@@ -19,47 +20,67 @@ def fetch_efforts_from_ado(config):
             f"AND [System.IterationPath] = '{config['iteration_path']}'"
         )
     }
-    wiql_url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/wiql?api-version={api_version}"
-    resp = requests.post(wiql_url, headers=headers, auth=auth, json=wiql)
-    resp.raise_for_status()
-    work_item_ids = [item['id'] for item in resp.json().get('workItems', [])]
+    wiql_url = f"{get_base_url(config)}/{organization}/{project}/_apis/wit/wiql?api-version={api_version}"
+    with metrics.phase("wiql"):
+        resp = client.post(wiql_url, json=wiql)
+        resp.raise_for_status()
+        work_item_ids = [item['id'] for item in resp.json().get('workItems', [])]
     
-    # Fetch details in batches
-    all_efforts = []
-    for i in range(0, len(work_item_ids), 200):
-        batch = work_item_ids[i:i+200]
+    # Fetch details in batches, concurrently
+    def fetch_batch(batch):
         ids_str = ','.join(map(str, batch))
-        url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems?ids={ids_str}&fields=System.Id,System.Title,Microsoft.VSTS.Scheduling.OriginalEstimate,Microsoft.VSTS.Scheduling.RemainingWork,Microsoft.VSTS.Scheduling.CompletedWork,System.State,System.AssignedTo&api-version={api_version}"
-        details_resp = requests.get(url, headers=headers, auth=auth)
+        url = f"{get_base_url(config)}/{organization}/{project}/_apis/wit/workitems?ids={ids_str}&fields=System.Id,System.Title,Microsoft.VSTS.Scheduling.OriginalEstimate,Microsoft.VSTS.Scheduling.RemainingWork,Microsoft.VSTS.Scheduling.CompletedWork,System.State,System.AssignedTo&api-version={api_version}"
+        details_resp = client.get(url)
         details_resp.raise_for_status()
-        for item in details_resp.json().get('value', []):
-            fields = item.get('fields', {})
-            # Exclude tasks with current state 'Removed'
-            if str(fields.get('System.State', '')).lower() == 'removed':
-                continue
-            assigned_to = None
-            assigned_field = fields.get('System.AssignedTo')
-            if isinstance(assigned_field, dict):
-                assigned_to = assigned_field.get('displayName')
-            elif isinstance(assigned_field, str):
-                assigned_to = assigned_field
-            all_efforts.append({
-                'id': item.get('id'),
-                'title': fields.get('System.Title'),
-                'original_estimate': fields.get('Microsoft.VSTS.Scheduling.OriginalEstimate'),
-                'remaining_work': fields.get('Microsoft.VSTS.Scheduling.RemainingWork'),
-                'completed_work': fields.get('Microsoft.VSTS.Scheduling.CompletedWork'),
-                'state': fields.get('System.State'),
-                'assigned_to': assigned_to,
-            })
-    # Save to file
-    with open(os.path.join(os.path.dirname(__file__), 'task_efforts.json'), 'w') as f:
-        json.dump(all_efforts, f, indent=2)
-    print(f"Saved {len(all_efforts)} tasks to task_efforts.json")
+        return details_resp.json().get('value', [])
+
+    batches = [work_item_ids[i:i+200] for i in range(0, len(work_item_ids), 200)]
+    with metrics.phase("details"):
+        work_items = [item for batch_items in client.map(fetch_batch, batches) for item in batch_items]
+    write_task_efforts(build_task_efforts(work_items), output_path)
+
+def build_task_efforts(work_items, tasks_only=False):
+    """
+    Builds task_efforts.json records from already-fetched work items.
+    Args:
+        work_items (list): Work items as returned by the workitems/workitemsbatch endpoints.
+        tasks_only (bool): Skip items that are not Tasks. Needed when work_items is the whole
+            iteration (as in XsprintADO.process_sprint_insights) rather than a Task-only query.
+    Returns:
+        list: Effort records, excluding tasks in the 'Removed' state.
+    """
+    all_efforts = []
+    for item in work_items:
+        fields = item.get('fields', {})
+        if tasks_only and fields.get('System.WorkItemType') != 'Task':
+            continue
+        # Exclude tasks with current state 'Removed'
+        if str(fields.get('System.State', '')).lower() == 'removed':
+            continue
+        assigned_to = None
+        assigned_field = fields.get('System.AssignedTo')
+        if isinstance(assigned_field, dict):
+            assigned_to = assigned_field.get('displayName')
+        elif isinstance(assigned_field, str):
+            assigned_to = assigned_field
+        all_efforts.append({
+            'id': item.get('id'),
+            'title': fields.get('System.Title'),
+            'original_estimate': fields.get('Microsoft.VSTS.Scheduling.OriginalEstimate'),
+            'remaining_work': fields.get('Microsoft.VSTS.Scheduling.RemainingWork'),
+            'completed_work': fields.get('Microsoft.VSTS.Scheduling.CompletedWork'),
+            'state': fields.get('System.State'),
+            'assigned_to': assigned_to,
+        })
+    return all_efforts
+
+def write_task_efforts(all_efforts, output_path=None):
+    output_path = output_path or os.path.join(os.path.dirname(__file__), 'task_efforts.json')
+    with metrics.phase("json_write"):
+        atomic_write_json(output_path, all_efforts, indent=2)
+    print(f"Saved {len(all_efforts)} tasks to {os.path.basename(output_path)}")
 
 if __name__ == "__main__":
     # If run directly, load config and fetch efforts
-    config_path = os.path.join(os.path.dirname(__file__), "config.json")
-    with open(config_path, "r", encoding="utf-8") as f:
-        config = json.load(f)
+    config = load_config()
     fetch_efforts_from_ado(config)
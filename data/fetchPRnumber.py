@@ -1,52 +1,161 @@
-import requests
-from requests.auth import HTTPBasicAuth
 import os
 import json
+import threading
+import time
+from adoClient import get_base_url, get_client
+from fileUtils import atomic_write_json, load_config
+from refreshMetrics import metrics
 
-def get_pull_requests_for_work_item(config, work_item_id):
+PR_CACHE_PATH = os.path.join(os.path.dirname(__file__), "pr_cache.json")
+# Completed and abandoned PRs never change again, so they are cached permanently
+FINAL_PR_STATUSES = {"completed", "abandoned"}
+DEFAULT_PR_CACHE_TTL_SECONDS = 300
+_pr_cache_lock = threading.Lock()
+
+def extract_pr_refs(relations):
     """
-    Fetches pull requests linked to a specific work item (task or user story) from Azure DevOps.
-    Args:
-        config (dict): Azure DevOps configuration.
-        work_item_id (int or str): The ID of the work item.
+    Returns the (repo_id, pr_id) pairs of the pull requests linked in a work item's relations.
+    """
+    pr_refs = []
+    for rel in relations or []:
+        pr_url = rel.get("url", "")
+        if not (rel.get("rel", "").endswith("ArtifactLink") and "PullRequestId" in pr_url):
+            continue
+        # The PR URL is in the format: vstfs:///Git/PullRequestId/{projectId}%2F{repoId}%2F{prId}
+        parts = pr_url.split("/PullRequestId/")[-1].split("%2F")
+        if len(parts) == 3:
+            project_id, repo_id, pr_id = parts
+            pr_refs.append((repo_id, pr_id))
+        else:
+            print(f"[ERROR] Could not parse PR link: {pr_url}")
+    return pr_refs
+
+def get_work_item_relations(config, work_item_ids):
+    """
+    Fetches the relations of many work items through the workitemsbatch endpoint, 200 IDs per call.
     Returns:
-        list: List of pull request details linked to the work item.
+        dict: Mapping of work item ID to its relations list.
+    """
+    url = f"{get_base_url(config)}/{config['organization']}/{config['project']}/_apis/wit/workitemsbatch?api-version=7.1"
+    client = get_client(config)
+
+    def fetch_batch(batch):
+        response = client.post(url, json={"ids": batch, "$expand": "Relations", "errorPolicy": "Omit"})
+        response.raise_for_status()
+        return [item for item in response.json().get("value", []) if item]
+
+    work_item_ids = list(work_item_ids)
+    batches = [work_item_ids[i:i + 200] for i in range(0, len(work_item_ids), 200)]
+    return {
+        item["id"]: item.get("relations", [])
+        for batch_items in client.map(fetch_batch, batches)
+        for item in batch_items
+    }
+
+def load_pr_cache(cache_path=None):
+    cache_path = cache_path or PR_CACHE_PATH
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Ignoring unreadable PR cache {cache_path}: {e}")
+        return {}
+
+def resolve_pull_requests(config, pr_refs):
+    """
+    Returns PR details for the given (repo_id, pr_id) pairs, using the on-disk PR cache.
+    Each PR is fetched at most once, and only when it is missing from the cache or is an
+    active PR older than pr_cache_ttl_seconds (config, default 300). Misses are fetched concurrently.
+    Returns:
+        dict: Mapping of (repo_id, pr_id) to PR details. PRs that could not be fetched are omitted.
     """
     organization = config["organization"]
     project = config["project"]
-    personal_access_token = config["personal_access_token"]
     api_version = config.get("api_version", "7.1-preview.1")
-    auth = HTTPBasicAuth('', personal_access_token)
-    headers = {"Content-Type": "application/json"}
+    ttl = config.get("pr_cache_ttl_seconds", DEFAULT_PR_CACHE_TTL_SECONDS)
+    client = get_client(config)
+    cache = load_pr_cache()
+    now = time.time()
 
-    # 1. Get work item relations (to find PR links)
-    url = f"https://dev.azure.com/{organization}/{project}/_apis/wit/workitems/{work_item_id}?$expand=relations&api-version={api_version}"
-    response = requests.get(url, auth=auth, headers=headers)
-    response.raise_for_status()
-    work_item = response.json()
-    pr_links = []
-    for rel in work_item.get("relations", []):
-        if rel.get("rel", "").endswith("ArtifactLink") and "PullRequestId" in rel.get("url", ""):
-            pr_links.append(rel["url"])
+    resolved = {}
+    missing = []
+    cache_hits = 0
+    for repo_id, pr_id in dict.fromkeys(pr_refs):
+        entry = cache.get(f"{repo_id}/{pr_id}")
+        if entry and (entry["pr"].get("status") in FINAL_PR_STATUSES or now - entry["fetched_at"] < ttl):
+            resolved[(repo_id, pr_id)] = entry["pr"]
+            cache_hits += 1
+        else:
+            missing.append((repo_id, pr_id))
 
-    # 2. Fetch PR details for each PR link
-    pr_details = []
-    for pr_url in pr_links:
-        # The PR URL is in the format: vstfs:///Git/PullRequestId/{projectId}%2F{repoId}%2F{prId}
-        # Extract PR ID and repo ID
-        try:
-            artifact_id = pr_url.split("/PullRequestId/")[-1]
-            parts = artifact_id.split("%2F")
-            if len(parts) == 3:
-                project_id, repo_id, pr_id = parts
-                # Get PR details
-                pr_api_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories/{repo_id}/pullrequests/{pr_id}?api-version={api_version}"
-                pr_resp = requests.get(pr_api_url, auth=auth, headers=headers)
-                if pr_resp.status_code == 200:
-                    pr_details.append(pr_resp.json())
-        except Exception as e:
-            print(f"[ERROR] Could not parse PR link: {pr_url} ({e})")
-    return pr_details
+    def fetch_pr(pr_ref):
+        repo_id, pr_id = pr_ref
+        pr_api_url = f"{get_base_url(config)}/{organization}/{project}/_apis/git/repositories/{repo_id}/pullrequests/{pr_id}?api-version={api_version}"
+        pr_resp = client.get(pr_api_url)
+        if pr_resp.status_code == 200:
+            return pr_resp.json()
+        return None
+
+    fetched = client.map(fetch_pr, missing, return_exceptions=True)
+    fetched_entries = {}
+    failed = 0
+    for (repo_id, pr_id), pr in zip(missing, fetched):
+        if isinstance(pr, Exception):
+            print(f"[ERROR] Could not fetch PR {pr_id} in repository {repo_id}: {pr}")
+            failed += 1
+            continue
+        if pr is None:
+            failed += 1
+            continue
+        resolved[(repo_id, pr_id)] = pr
+        fetched_entries[f"{repo_id}/{pr_id}"] = {"fetched_at": now, "pr": pr}
+    if missing:
+        # Targets refreshed in parallel share the cache; merge into its latest contents so
+        # one target's write does not drop PRs another target just fetched
+        with _pr_cache_lock:
+            cache = load_pr_cache()
+            cache.update(fetched_entries)
+            atomic_write_json(PR_CACHE_PATH, cache)
+    print(f"[INFO] Resolved {len(resolved)} pull requests ({len(fetched_entries)} fetched, {cache_hits} from cache, {failed} not found or failed)")
+    return resolved
+
+def get_pull_requests_for_work_items(config, work_item_ids, relations_by_id=None):
+    """
+    Fetches pull requests linked to many work items, deduplicating PRs across all of them.
+    Args:
+        config (dict): Azure DevOps configuration.
+        work_item_ids (list): IDs of the work items.
+        relations_by_id (dict, optional): Already-loaded relations per work item ID. Relations of
+            work items not in this mapping are fetched in batches.
+    Returns:
+        dict: Mapping of work item ID to the list of its pull request details.
+    """
+    relations_by_id = dict(relations_by_id or {})
+    with metrics.phase("pr_enrichment"):
+        unknown = [i for i in work_item_ids if i not in relations_by_id]
+        if unknown:
+            relations_by_id.update(get_work_item_relations(config, unknown))
+        pr_refs_by_id = {i: extract_pr_refs(relations_by_id.get(i)) for i in work_item_ids}
+        resolved = resolve_pull_requests(config, [ref for refs in pr_refs_by_id.values() for ref in refs])
+    return {
+        i: [resolved[ref] for ref in refs if ref in resolved]
+        for i, refs in pr_refs_by_id.items()
+    }
+
+def get_pull_requests_for_work_item(config, work_item_id, relations=None):
+    """
+    Fetches pull requests linked to a specific work item (task or user story) from Azure DevOps.
+    Args:
+        config (dict): Azure DevOps configuration.
+        work_item_id (int or str): The ID of the work item.
+        relations (list, optional): The work item's relations, if already loaded.
+    Returns:
+        list: List of pull request details linked to the work item.
+    """
+    relations_by_id = {work_item_id: relations} if relations is not None else None
+    return get_pull_requests_for_work_items(config, [work_item_id], relations_by_id)[work_item_id]
 
 def write_prs_to_structured_json(config, insights_path=None, output_path=None):
     """
@@ -62,25 +171,23 @@ def write_prs_to_structured_json(config, insights_path=None, output_path=None):
         output_path = os.path.join(os.path.dirname(__file__), "pr_structured.json")
     with open(insights_path, "r", encoding="utf-8") as f:
         insights = json.load(f)
+    # Remove the closed state check, include all work items
+    prs_by_id = get_pull_requests_for_work_items(config, [item["id"] for item in insights])
     pr_structured = []
     for item in insights:
-        # Remove the closed state check, include all work items
-        prs = get_pull_requests_for_work_item(config, item["id"])
         pr_structured.append({
             "id": item["id"],
             "title": item.get("title", ""),
             "type": item.get("type", ""),
-            "pull_requests": prs
+            "pull_requests": prs_by_id.get(item["id"], [])
         })
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(pr_structured, f, indent=2)
+    with metrics.phase("json_write"):
+        atomic_write_json(output_path, pr_structured, indent=2)
     print(f"[INFO] Structured PR data written to {output_path}")
 
 # Ensure this function is always available for import
-__all__ = ["get_pull_requests_for_work_item", "write_prs_to_structured_json"]
+__all__ = ["get_pull_requests_for_work_item", "get_pull_requests_for_work_items", "write_prs_to_structured_json"]
 
 if __name__ == "__main__":
-    config_path = os.path.join(os.path.dirname(__file__), "config.json")
-    with open(config_path, "r", encoding="utf-8") as f:
-        config = json.load(f)
+    config = load_config()
     write_prs_to_structured_json(config)
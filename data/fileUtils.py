@@ -0,0 +1,111 @@
+import os
+import json
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+# os.umask can only be read by setting it, which is not thread-safe; read it once at import
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+# Permissions a plain open() would give a new file: mkstemp creates temporary files owner-only,
+# and os.replace would carry that over to the output
+DEFAULT_FILE_MODE = 0o666 & ~_UMASK
+
+def load_config(config_path=None):
+    """
+    Loads the Azure DevOps configuration. Defaults to config.json next to this module.
+    """
+    with open(config_path or CONFIG_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+@contextmanager
+def atomic_open(path, mode="w"):
+    """
+    Opens a temporary file next to path for writing; when the block completes it is flushed
+    to disk and renamed over path, so readers never see a half-written file. If the block
+    raises, path is left untouched.
+    Args:
+        path (str): Destination file.
+        mode (str): "w" for text (UTF-8) or "wb" for binary.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, DEFAULT_FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """
+    Writes data as JSON to path without ever exposing a half-written file: the JSON is
+    written to a temporary file in the same directory, flushed to disk, then renamed over path.
+    Args:
+        path (str): Destination file.
+        data: JSON-serialisable data.
+        **dump_kwargs: Passed through to json.dump (e.g. indent=2).
+    """
+    with atomic_open(path) as f:
+        json.dump(data, f, **dump_kwargs)
+
+@contextmanager
+def atomic_json_array_writer(path, indent=None):
+    """
+    Streams a JSON array to path one element at a time, atomically like atomic_write_json.
+    Yields a function that writes one element. With indent the output is byte-identical to
+    json.dump(elements, f, indent=indent); without it each element is written compactly on
+    its own line.
+    """
+    with atomic_open(path) as f:
+        count = 0
+
+        def write(element):
+            nonlocal count
+            if indent is None:
+                text = json.dumps(element, separators=(",", ":"))
+            else:
+                prefix = " " * indent
+                text = prefix + json.dumps(element, indent=indent).replace("\n", "\n" + prefix)
+            f.write(("[\n" if count == 0 else ",\n") + text)
+            count += 1
+
+        yield write
+        f.write("\n]" if count else "[]")
+
+@contextmanager
+def file_lock(lock_path):
+    """
+    Holds an exclusive, blocking inter-process lock on lock_path for the duration of the block.
+    """
+    with open(lock_path, "a+") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            # msvcrt.LK_LOCK only retries for ~10 seconds, so keep retrying until the lock is ours
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
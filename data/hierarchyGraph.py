@@ -0,0 +1,176 @@
+import os
+import json
+from datetime import datetime, timezone
+from adoClient import get_base_url, get_client
+from fileUtils import atomic_write_json
+from refreshMetrics import metrics
+
+HIERARCHY_FORWARD = "System.LinkTypes.Hierarchy-Forward"
+HIERARCHY_REVERSE = "System.LinkTypes.Hierarchy-Reverse"
+# Fields kept for every node of the hierarchy
+HIERARCHY_FIELDS = [
+    "System.Id",
+    "System.Title",
+    "System.WorkItemType",
+    "System.State",
+    "System.IterationPath",
+    "System.AssignedTo",
+]
+# IDs per WorkItemLinks query; keeps the WIQL text well under its 32K character limit
+LINK_QUERY_CHUNK = 200
+
+def query_links(config, where, mode):
+    """
+    Runs a WorkItemLinks WIQL query over hierarchy links.
+    Args:
+        config (dict): Azure DevOps configuration.
+        where (str): Source/target criteria, ANDed with the link type.
+        mode (tuple): (link type, WIQL mode), e.g. (HIERARCHY_FORWARD, "Recursive").
+    Returns:
+        tuple: (set of IDs that matched the source criteria, list of (parent_id, child_id) edges)
+    """
+    link_type, wiql_mode = mode
+    url = f"{get_base_url(config)}/{config['organization']}/{config['project']}/_apis/wit/wiql?api-version={config['api_version']}"
+    query = {
+        "query": (
+            f"SELECT [System.Id] FROM WorkItemLinks "
+            f"WHERE {where} "
+            f"AND [System.Links.LinkType] = '{link_type}' "
+            f"MODE ({wiql_mode})"
+        )
+    }
+    response = get_client(config).post(url, json=query)
+    response.raise_for_status()
+    sources, edges = set(), []
+    for relation in response.json().get("workItemRelations", []):
+        source = (relation.get("source") or {}).get("id")
+        target = (relation.get("target") or {}).get("id")
+        if not relation.get("rel"):
+            # Items matching the source criteria are listed once without a link
+            if target is not None:
+                sources.add(target)
+            continue
+        if source is None or target is None:
+            continue
+        if relation["rel"] == HIERARCHY_FORWARD:
+            edges.append((source, target))
+        elif relation["rel"] == HIERARCHY_REVERSE:
+            edges.append((target, source))
+    return sources, edges
+
+def get_hierarchy_closure(config, work_item_ids):
+    """
+    Collects every ancestor and descendant of the configured area/iteration through hierarchy links.
+    Descendants come from one recursive WorkItemLinks query; ancestors are walked up one level
+    per query (typically Task -> User Story -> Feature -> Epic), in chunks of LINK_QUERY_CHUNK IDs.
+    Args:
+        config (dict): Azure DevOps configuration.
+        work_item_ids (list): IDs of the items in the iteration.
+    Returns:
+        set: (parent_id, child_id) hierarchy edges.
+    """
+    client = get_client(config)
+    edges = set()
+    sources, descendant_edges = query_links(
+        config,
+        f"[Source].[System.AreaPath] = '{config['area_path']}' "
+        f"AND [Source].[System.IterationPath] = '{config['iteration_path']}'",
+        (HIERARCHY_FORWARD, "Recursive"),
+    )
+    edges.update(descendant_edges)
+
+    seen = set(work_item_ids) | sources | {child for _, child in edges}
+    frontier = sorted(seen)
+    while frontier:
+        chunks = [frontier[i:i + LINK_QUERY_CHUNK] for i in range(0, len(frontier), LINK_QUERY_CHUNK)]
+        results = client.map(
+            lambda chunk: query_links(
+                config, f"[Source].[System.Id] IN ({', '.join(map(str, chunk))})", (HIERARCHY_REVERSE, "MayContain")),
+            chunks,
+        )
+        new_parents = set()
+        for _, parent_edges in results:
+            edges.update(parent_edges)
+            new_parents.update(parent for parent, _ in parent_edges)
+        frontier = sorted(new_parents - seen)
+        seen.update(frontier)
+    return edges
+
+def _node(work_item_id, fields, in_iteration):
+    assigned_to = fields.get("System.AssignedTo")
+    return {
+        "id": work_item_id,
+        "title": fields.get("System.Title", "N/A"),
+        "type": fields.get("System.WorkItemType", "N/A"),
+        "state": fields.get("System.State", "N/A"),
+        "iteration_path": fields.get("System.IterationPath"),
+        "assigned_to": assigned_to.get("displayName") if isinstance(assigned_to, dict) else assigned_to or "Unassigned",
+        "in_iteration": in_iteration,
+    }
+
+def build_hierarchy(config, work_item_ids, known_items=None):
+    """
+    Builds the adjacency index of the iteration's full parent/child closure.
+    Args:
+        config (dict): Azure DevOps configuration.
+        work_item_ids (list): IDs of the items in the iteration.
+        known_items (dict, optional): Nodes (see _node) already known, keyed by ID. Only items
+            missing from it are fetched, in batches of 200.
+    Returns:
+        dict: {"generated_at", "root_ids", "items", "parents", "children"}; JSON object keys are IDs.
+    """
+    from XsprintADO import get_work_items_details_batch
+    with metrics.phase("hierarchy_links"):
+        edges = get_hierarchy_closure(config, work_item_ids)
+    in_iteration = set(work_item_ids)
+    items = {i: dict(node) for i, node in (known_items or {}).items()}
+    linked_ids = {i for edge in edges for i in edge}
+    missing = sorted((linked_ids | in_iteration) - set(items))
+    if missing:
+        with metrics.phase("hierarchy_details"):
+            details = get_work_items_details_batch(config, missing, fields=HIERARCHY_FIELDS)
+        for work_item_id, item in details.items():
+            items[work_item_id] = _node(work_item_id, item.get("fields", {}), work_item_id in in_iteration)
+    print(f"[INFO] Hierarchy: {len(edges)} links across {len(linked_ids | in_iteration)} items, "
+          f"{len(missing)} fetched, {len(linked_ids - in_iteration)} outside the iteration")
+
+    parents, children = {}, {}
+    for parent, child in sorted(edges):
+        parents[str(child)] = parent
+        children.setdefault(str(parent), []).append(child)
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "root_ids": sorted(in_iteration),
+        "items": {str(i): items[i] for i in sorted(items) if i in linked_ids or i in in_iteration},
+        "parents": parents,
+        "children": children,
+    }
+
+def write_hierarchy(config, output_dir):
+    """
+    Writes hierarchy.json for the configured area and iteration. Items already in
+    sprint_insights.json (when present) are not fetched again.
+    """
+    insights_path = os.path.join(output_dir, "sprint_insights.json")
+    known_items = {}
+    if os.path.exists(insights_path):
+        with open(insights_path, "r", encoding="utf-8") as f:
+            for insight in json.load(f):
+                known_items[insight["id"]] = {
+                    "id": insight["id"],
+                    "title": insight.get("title", "N/A"),
+                    "type": insight.get("type", "N/A"),
+                    "state": insight.get("current_state", "N/A"),
+                    "iteration_path": config["iteration_path"],
+                    "assigned_to": insight.get("assigned_to", "Unassigned"),
+                    "in_iteration": True,
+                }
+        work_item_ids = sorted(known_items)
+    else:
+        from XsprintADO import get_area_and_iteration_work_items
+        work_item_ids = get_area_and_iteration_work_items(config, config["area_path"], config["iteration_path"])
+    hierarchy = build_hierarchy(config, work_item_ids, known_items)
+    output_path = os.path.join(output_dir, "hierarchy.json")
+    with metrics.phase("json_write"):
+        atomic_write_json(output_path, hierarchy, indent=2)
+    print(f"[INFO] Hierarchy written to {output_path}")
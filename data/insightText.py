@@ -0,0 +1,106 @@
+import os
+import json
+from fileUtils import atomic_open, atomic_write_json
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+TEXT_FILENAME = "sprint_insights_text.ndjson"
+INDEX_FILENAME = "sprint_insights_text.index.json"
+# Bulky, rarely-read insight fields that compact mode moves out of sprint_insights.json
+TEXT_FIELDS = ["description", "comments_added"]
+
+def split_text_fields(insight):
+    """
+    Splits an insight into its compact part and its text fields.
+    Returns:
+        tuple: (insight without TEXT_FIELDS, {"id", **TEXT_FIELDS})
+    """
+    compact = {k: v for k, v in insight.items() if k not in TEXT_FIELDS}
+    text = {"id": insight["id"], **{field: insight[field] for field in TEXT_FIELDS if field in insight}}
+    return compact, text
+
+class InsightTextWriter:
+    """
+    Writes the text fields of each insight as one NDJSON line of sprint_insights_text.ndjson,
+    plus sprint_insights_text.index.json mapping each work item ID to the [offset, length] of
+    its line in bytes, so a reader can load one item's text without parsing the rest.
+    Both files are replaced atomically when the block completes, the index last.
+    """
+
+    def __init__(self, output_dir=None):
+        output_dir = output_dir or DATA_DIR
+        self.text_path = os.path.join(output_dir, TEXT_FILENAME)
+        self.index_path = os.path.join(output_dir, INDEX_FILENAME)
+        self.index = {}
+        self._offset = 0
+        self._file = None
+
+    def __enter__(self):
+        self._context = atomic_open(self.text_path, "wb")
+        self._file = self._context.__enter__()
+        return self
+
+    def write(self, text):
+        line = json.dumps(text, separators=(",", ":")).encode("utf-8") + b"\n"
+        self._file.write(line)
+        self.index[str(text["id"])] = [self._offset, len(line)]
+        self._offset += len(line)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._context.__exit__(exc_type, exc, tb)
+        if exc_type is None:
+            atomic_write_json(self.index_path, self.index)
+
+_index_cache = {}
+
+def _load_index(index_path):
+    mtime = os.path.getmtime(index_path)
+    cached = _index_cache.get(index_path)
+    if cached is None or cached[0] != mtime:
+        with open(index_path, "r", encoding="utf-8") as f:
+            cached = _index_cache[index_path] = (mtime, json.load(f))
+    return cached[1]
+
+def get_item_text(work_item_id, data_dir=None):
+    """
+    Returns the description and comments of one work item written in compact mode.
+    Args:
+        work_item_id (int): The work item ID.
+        data_dir (str, optional): Directory holding the text files. Defaults to this directory.
+    Returns:
+        dict: {"id", "description", "comments_added"}, or None if the item has no stored text.
+    """
+    data_dir = data_dir or DATA_DIR
+    index_path = os.path.join(data_dir, INDEX_FILENAME)
+    text_path = os.path.join(data_dir, TEXT_FILENAME)
+    if not os.path.exists(text_path):
+        return None
+    try:
+        entry = _load_index(index_path).get(str(work_item_id))
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Ignoring unreadable text index {index_path}: {e}")
+        return _scan_item_text(text_path, work_item_id)
+    if entry is None:
+        return None
+    offset, length = entry
+    with open(text_path, "rb") as f:
+        f.seek(offset)
+        try:
+            text = json.loads(f.read(length))
+        except ValueError:
+            text = None
+    if isinstance(text, dict) and str(text.get("id")) == str(work_item_id):
+        return text
+    # The two files are replaced one after the other; if a refresh landed in between,
+    # the offset is stale, so scan for the item instead
+    return _scan_item_text(text_path, work_item_id)
+
+def _scan_item_text(text_path, work_item_id):
+    with open(text_path, "rb") as f:
+        for line in f:
+            try:
+                text = json.loads(line)
+            except ValueError:
+                continue
+            if str(text.get("id")) == str(work_item_id):
+                return text
+    return None
@@ -0,0 +1,48 @@
+import os
+import time
+from fileUtils import file_lock
+
+DEFAULT_LOCK_PATH = os.path.join(os.path.dirname(__file__), ".refresh.lock")
+DEFAULT_MAX_AGE_SECONDS = 60
+
+def outputs_age(output_paths):
+    """
+    Returns the age in seconds of the oldest output file, or None if any output is missing.
+    """
+    mtimes = []
+    for path in output_paths:
+        if not os.path.exists(path):
+            return None
+        mtimes.append(os.path.getmtime(path))
+    return time.time() - min(mtimes) if mtimes else None
+
+def coordinated_refresh(refresh_fn, output_paths, max_age_seconds=DEFAULT_MAX_AGE_SECONDS, lock_path=None):
+    """
+    Runs refresh_fn at most once across concurrent callers (single-flight).
+
+    The refresh is skipped when every output is younger than max_age_seconds. Otherwise the
+    caller takes an exclusive file lock; callers that arrive while a refresh is in progress
+    block on the lock and, once it is released, reuse the outputs it produced instead of
+    starting their own refresh.
+    Args:
+        refresh_fn (callable): Refreshes the data and writes output_paths.
+        output_paths (list): Files produced by refresh_fn, used to judge freshness.
+        max_age_seconds (float): Freshness window; 0 always refreshes unless a concurrent refresh just finished.
+        lock_path (str, optional): Lock file shared by all callers. Defaults to data/.refresh.lock.
+    Returns:
+        bool: True if this caller ran refresh_fn, False if existing data was reused.
+    """
+    lock_path = lock_path or DEFAULT_LOCK_PATH
+    requested_at = time.time()
+    age = outputs_age(output_paths)
+    if age is not None and age < max_age_seconds:
+        print(f"[INFO] Data is {age:.0f}s old (freshness window {max_age_seconds}s), skipping refresh")
+        return False
+    with file_lock(lock_path):
+        # Another caller may have completed a refresh while we were waiting for the lock
+        age = outputs_age(output_paths)
+        if age is not None and (age < max_age_seconds or time.time() - age >= requested_at):
+            print("[INFO] Data was refreshed by a concurrent caller, skipping refresh")
+            return False
+        refresh_fn()
+        return True
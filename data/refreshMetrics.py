@@ -0,0 +1,193 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from fileUtils import atomic_open, atomic_write_json
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_PATH = os.path.join(DATA_DIR, "refresh_metrics.json")
+PROMETHEUS_PATH = os.path.join(DATA_DIR, "refresh_metrics.prom")
+# Upper bounds (seconds) of the request latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$")
+
+def endpoint_name(method, url):
+    """
+    Groups a request URL by endpoint: the path after "_apis/" with IDs replaced by {id},
+    e.g. "GET wit/workitems/{id}/updates".
+    """
+    path = url.split("?", 1)[0]
+    path = path.split("/_apis/", 1)[-1].lower()
+    segments = ["{id}" if _ID_SEGMENT.match(s) else s for s in path.split("/")]
+    # Repository names and IDs in git routes are as unbounded as work item IDs
+    if len(segments) > 2 and segments[:2] == ["git", "repositories"]:
+        segments[2] = "{id}"
+    return f"{method.upper()} {'/'.join(segments)}"
+
+class RefreshMetrics:
+    """
+    Thread-safe counters for one refresh: time spent per phase, and per ADO endpoint the
+    request count, latency histogram, retries, throttled responses, errors and bytes received.
+    Phase time is summed over every thread that ran the phase, so concurrent phases can add up
+    to more than the wall time of the refresh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self._started = time.perf_counter()
+            self.phases = {}
+            self.endpoints = {}
+            self.throttle_pauses = 0
+            self.throttle_pause_seconds = 0.0
+
+    @contextmanager
+    def phase(self, name):
+        """Times the enclosed block as one run of the named phase."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - started)
+
+    def record_phase(self, name, seconds):
+        """Records one run of the named phase that took the given seconds, e.g. time summed per item."""
+        with self._lock:
+            phase = self.phases.setdefault(name, {"count": 0, "seconds": 0.0})
+            phase["count"] += 1
+            phase["seconds"] += seconds
+
+    def _endpoint(self, method, url):
+        name = endpoint_name(method, url)
+        endpoint = self.endpoints.get(name)
+        if endpoint is None:
+            endpoint = self.endpoints[name] = {
+                "requests": 0, "errors": 0, "retries": 0, "throttled": 0, "bytes": 0,
+                "latency_seconds": 0.0, "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                "status_codes": {},
+            }
+        return endpoint
+
+    def record_request(self, method, url, seconds, status_code=None, content_bytes=0):
+        """
+        Records one HTTP attempt. status_code is None when no response was received.
+        """
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            endpoint = self._endpoint(method, url)
+            endpoint["requests"] += 1
+            endpoint["latency_seconds"] += seconds
+            endpoint["latency_buckets"][bucket] += 1
+            endpoint["bytes"] += content_bytes
+            status = str(status_code) if status_code is not None else "error"
+            endpoint["status_codes"][status] = endpoint["status_codes"].get(status, 0) + 1
+            if status_code is None or status_code >= 400:
+                endpoint["errors"] += 1
+            if status_code == 429:
+                endpoint["throttled"] += 1
+
+    def record_retry(self, method, url):
+        with self._lock:
+            self._endpoint(method, url)["retries"] += 1
+
+    def record_throttle_pause(self, seconds):
+        """Records a pause of every worker ordered by Retry-After or X-RateLimit-* headers."""
+        with self._lock:
+            self.throttle_pauses += 1
+            self.throttle_pause_seconds += seconds
+
+    def snapshot(self):
+        """Returns the metrics as a JSON-serialisable dict."""
+        with self._lock:
+            endpoints = {}
+            for name, endpoint in sorted(self.endpoints.items()):
+                endpoints[name] = {
+                    **{k: v for k, v in endpoint.items() if k not in ("latency_buckets", "status_codes")},
+                    "status_codes": dict(endpoint["status_codes"]),
+                    "latency_histogram": {
+                        **{str(bound): count for bound, count in zip(LATENCY_BUCKETS, endpoint["latency_buckets"])},
+                        "+Inf": endpoint["latency_buckets"][-1],
+                    },
+                }
+            totals = {
+                key: sum(e[key] for e in self.endpoints.values())
+                for key in ("requests", "errors", "retries", "throttled", "bytes")
+            }
+            return {
+                "started_at": self.started_at.isoformat(),
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+                "duration_seconds": time.perf_counter() - self._started,
+                "phases": {name: dict(phase) for name, phase in self.phases.items()},
+                "totals": {**totals, "throttle_pauses": self.throttle_pauses,
+                           "throttle_pause_seconds": self.throttle_pause_seconds},
+                "endpoints": endpoints,
+            }
+
+def to_prometheus(snapshot):
+    """
+    Renders a metrics snapshot in the Prometheus text exposition format.
+    """
+    def label(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+    lines = [
+        "# HELP xsprint_refresh_duration_seconds Wall time of the last refresh.",
+        "# TYPE xsprint_refresh_duration_seconds gauge",
+        f"xsprint_refresh_duration_seconds {snapshot['duration_seconds']:.6f}",
+        "# HELP xsprint_phase_seconds Time spent in each refresh phase, summed over threads.",
+        "# TYPE xsprint_phase_seconds gauge",
+    ]
+    lines += [f'xsprint_phase_seconds{{phase="{label(name)}"}} {phase["seconds"]:.6f}' for name, phase in snapshot["phases"].items()]
+    lines += ["# HELP xsprint_phase_runs Number of times each refresh phase ran.", "# TYPE xsprint_phase_runs gauge"]
+    lines += [f'xsprint_phase_runs{{phase="{label(name)}"}} {phase["count"]}' for name, phase in snapshot["phases"].items()]
+    for key, help_text in (
+        ("requests", "HTTP requests sent to Azure DevOps, including retries."),
+        ("errors", "Requests that failed or returned a status of 400 or above."),
+        ("retries", "Requests retried after throttling or a transient failure."),
+        ("throttled", "Requests answered with 429 Too Many Requests."),
+        ("bytes", "Response bytes received."),
+    ):
+        metric = f"xsprint_ado_{key}_total"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        lines += [f'{metric}{{endpoint="{label(name)}"}} {e[key]}' for name, e in snapshot["endpoints"].items()]
+    lines += [
+        "# HELP xsprint_ado_request_duration_seconds Latency of requests to Azure DevOps.",
+        "# TYPE xsprint_ado_request_duration_seconds histogram",
+    ]
+    for name, endpoint in snapshot["endpoints"].items():
+        cumulative = 0
+        for bound, count in endpoint["latency_histogram"].items():
+            cumulative += count
+            lines.append(f'xsprint_ado_request_duration_seconds_bucket{{endpoint="{label(name)}",le="{bound}"}} {cumulative}')
+        lines.append(f'xsprint_ado_request_duration_seconds_sum{{endpoint="{label(name)}"}} {endpoint["latency_seconds"]:.6f}')
+        lines.append(f'xsprint_ado_request_duration_seconds_count{{endpoint="{label(name)}"}} {endpoint["requests"]}')
+    lines += [
+        "# HELP xsprint_ado_throttle_pause_seconds Time all workers paused for ADO rate limits.",
+        "# TYPE xsprint_ado_throttle_pause_seconds counter",
+        f"xsprint_ado_throttle_pause_seconds {snapshot['totals']['throttle_pause_seconds']:.6f}",
+    ]
+    return "\n".join(lines) + "\n"
+
+def write_metrics(output_path=None, prometheus_path=None):
+    """
+    Writes the metrics of this process to refresh_metrics.json, and in the Prometheus text
+    format to prometheus_path when given.
+    """
+    snapshot = metrics.snapshot()
+    output_path = output_path or METRICS_PATH
+    atomic_write_json(output_path, snapshot, indent=2)
+    if prometheus_path:
+        with atomic_open(prometheus_path) as f:
+            f.write(to_prometheus(snapshot))
+    print(f"[INFO] Refresh metrics written to {output_path}")
+    return snapshot
+
+# Shared by every module of the pipeline, like the AdoClient
+metrics = RefreshMetrics()
@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta
+from adoClient import get_base_url, get_client
+
+# Fields parse_changes consumes, plus the ones needed to rebuild /updates entries
+REVISION_FIELDS = [
+    "System.Id",
+    "System.Rev",
+    "System.ChangedBy",
+    "System.ChangedDate",
+    "System.State",
+    "System.AssignedTo",
+    "System.Tags",
+    "System.History",
+]
+DIFFED_FIELDS = ["System.State", "System.AssignedTo", "System.Tags"]
+# /updates reports this revisedDate for the latest revision of an item
+LATEST_REVISED_DATE = "9999-01-01T00:00:00Z"
+
+def iter_reporting_revisions(config, fields=None, start_date_time=None, types=None):
+    """
+    Yields pages of work item revisions for the project from the reporting
+    workitemrevisions endpoint, following continuation tokens until the last batch.
+    Args:
+        config (dict): Azure DevOps configuration.
+        fields (list, optional): Fields to return for each revision. Defaults to REVISION_FIELDS.
+        start_date_time (str, optional): Only return revisions made after this time. Without it
+            the scan starts at the creation of the project.
+        types (list, optional): Only return revisions of work items of these types.
+    Yields:
+        list: One page of revisions ({"id", "rev", "fields"}).
+    """
+    url = f"{get_base_url(config)}/{config['organization']}/{config['project']}/_apis/wit/reporting/workitemrevisions"
+    params = {
+        "fields": ",".join(fields or REVISION_FIELDS),
+        "includeIdentityRef": "true",
+        "api-version": "7.1",
+    }
+    if start_date_time:
+        params["startDateTime"] = start_date_time
+    if types:
+        params["types"] = ",".join(types)
+    client = get_client(config)
+    while True:
+        response = client.get(url, params=params)
+        response.raise_for_status()
+        page = response.json()
+        yield page.get("values", [])
+        if page.get("isLastBatch", True) or not page.get("continuationToken"):
+            return
+        params["continuationToken"] = page["continuationToken"]
+
+def revisions_to_updates(revisions, relations=None, previous=None, first_id=1):
+    """
+    Converts the full-snapshot revisions of one work item into /updates-style diffs, so
+    parse_changes produces the same state_changes, assigned_date, tags_added and comments_added.
+    Args:
+        revisions (list): Revisions of a single work item, in any order.
+        relations (list, optional): Relations to report as added in the first update: the item's
+            current relations, or when resuming those added since. The reporting endpoint does not
+            return relation history.
+        previous (dict, optional): Fields of the revision before the first one, when resuming.
+        first_id (int): Update number of the first revision.
+    Returns:
+        list: Updates in the shape returned by /workItems/{id}/updates.
+    """
+    revisions = sorted(revisions, key=lambda r: r.get("rev", 0))
+    updates = []
+    previous = previous or {}
+    for index, revision in enumerate(revisions):
+        fields = revision.get("fields", {})
+        changed = {}
+        for field in DIFFED_FIELDS:
+            if fields.get(field) != previous.get(field):
+                changed[field] = {"oldValue": previous.get(field), "newValue": fields.get(field)}
+        # History holds only the comment added in that revision, so it is never diffed
+        if fields.get("System.History"):
+            changed["System.History"] = {"newValue": fields["System.History"]}
+        changed_by = fields.get("System.ChangedBy")
+        update = {
+            "id": first_id + index,
+            "rev": revision.get("rev"),
+            "revisedBy": changed_by if isinstance(changed_by, dict) else {"displayName": changed_by or "Unknown"},
+            # As in /updates, revisedDate is when this revision was superseded
+            "revisedDate": (
+                revisions[index + 1].get("fields", {}).get("System.ChangedDate", LATEST_REVISED_DATE)
+                if index + 1 < len(revisions) else LATEST_REVISED_DATE
+            ),
+            "fields": changed,
+        }
+        if index == 0 and relations:
+            update["relations"] = {"added": relations}
+        updates.append(update)
+        previous = fields
+    return updates
+
+def _scan_start(timestamps):
+    """
+    Returns the reporting startDateTime just before the earliest of the given ADO timestamps, or
+    None if one is unknown. ADO timestamps share one ISO-8601 format, so the earliest sorts first;
+    the start backs off a second so sub-second precision cannot exclude that revision.
+    """
+    if not timestamps or None in timestamps:
+        return None
+    earliest = datetime.strptime(min(timestamps)[:19], "%Y-%m-%dT%H:%M:%S") - timedelta(seconds=1)
+    return earliest.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def get_updates_from_revisions(config, work_item_ids, details_by_id=None, stored_items=None, watermark=None):
+    """
+    Fetches the history of many work items in one paged reporting scan.
+
+    The scan is bounded by startDateTime and limited to the items' work item types, so its length
+    depends on the project's activity in that window rather than since the project was created:
+    - items without a stored fold need their full history, from just before they were created;
+    - stored items (incremental sync) only need the revisions made after the watermark.
+    Args:
+        config (dict): Azure DevOps configuration.
+        work_item_ids (list): IDs whose history is needed; revisions of other items are skipped.
+        details_by_id (dict, optional): Work item details, used for links and to bound the scan.
+        stored_items (dict, optional): Work item store entries to resume from (see fold_history).
+        watermark (str, optional): asOf time of the run that saved stored_items.
+    Returns:
+        dict: Mapping of work item ID to (stored entry to resume from or None, /updates-style
+            updates that follow it, starting with its refetched last update).
+    """
+    details_by_id = details_by_id or {}
+    stored_items = stored_items or {}
+    wanted = set(work_item_ids)
+    # Resuming diffs the new revisions against the stored details, so a watermark is required
+    resumed = {
+        i: stored_items[str(i)] for i in wanted
+        if watermark and str(i) in stored_items and stored_items[str(i)].get("last_update")
+    }
+    revisions_by_id = {i: [] for i in wanted}
+    fields_by_id = {i: (details_by_id.get(i) or {}).get("fields", {}) for i in wanted}
+    start_date_time = _scan_start(
+        [fields_by_id[i].get("System.CreatedDate") for i in wanted - set(resumed)]
+        + ([watermark] if resumed else [])
+    )
+    types = {fields_by_id[i].get("System.WorkItemType") for i in wanted}
+    if start_date_time is None:
+        print("[WARN] Creation date missing for some work items, scanning revisions since the project was created")
+    for page in iter_reporting_revisions(config, start_date_time=start_date_time,
+                                         types=sorted(types) if None not in types else None):
+        for revision in page:
+            work_item_id = revision.get("id")
+            if work_item_id not in wanted:
+                continue
+            if work_item_id in resumed and revision.get("rev", 0) <= resumed[work_item_id].get("rev", 0):
+                continue
+            revisions_by_id[work_item_id].append(revision)
+
+    history = {}
+    for i, revisions in revisions_by_id.items():
+        entry = resumed.get(i)
+        if entry is None:
+            history[i] = (None, revisions_to_updates(revisions, (details_by_id.get(i) or {}).get("relations")))
+            continue
+        # Revisions carry no links, so links added since the stored details go on the first new update;
+        # details stored without relations cannot be diffed
+        new_links = []
+        if "relations" in entry["details"]:
+            stored_links = {(rel.get("rel"), rel.get("url")) for rel in entry["details"]["relations"]}
+            new_links = [
+                rel for rel in (details_by_id.get(i) or {}).get("relations", [])
+                if (rel.get("rel"), rel.get("url")) not in stored_links
+            ]
+        updates = revisions_to_updates(revisions, new_links, previous=entry["details"].get("fields", {}),
+                                       first_id=entry["update_count"] + 1)
+        # The held-back last update is superseded by the first new revision
+        last_update = dict(entry["last_update"])
+        if updates:
+            first = min(revisions, key=lambda r: r.get("rev", 0))
+            last_update["revisedDate"] = first.get("fields", {}).get("System.ChangedDate", LATEST_REVISED_DATE)
+        elif new_links:
+            added = last_update.get("relations", {}).get("added", [])
+            last_update["relations"] = {**last_update.get("relations", {}), "added": added + new_links}
+        history[i] = (entry, [last_update] + updates)
+    return history
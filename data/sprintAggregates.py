@@ -0,0 +1,117 @@
+import os
+import json
+from datetime import datetime, timezone
+from fileUtils import atomic_write_json
+from refreshMetrics import metrics
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+AGGREGATES_PATH = os.path.join(DATA_DIR, "sprint_aggregates.json")
+
+# Type and state buckets used by the analyze-workitem-states tool
+STATE_COUNT_TYPES = {"feature": "features", "user story": "user_stories", "task": "tasks"}
+STATE_BUCKETS = {"new": "New", "committed": "Committed", "active": "Active", "closed": "Closed"}
+
+def _load_json(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def compute_sprint_aggregates(sprint_insights, task_efforts, capacity):
+    """
+    Computes the sprint aggregates the MCP tools need in one pass over each input.
+    Args:
+        sprint_insights (list): Contents of sprint_insights.json.
+        task_efforts (list): Contents of task_efforts.json.
+        capacity (dict): Contents of capacity_structured.json.
+    Returns:
+        dict: State counts, completion rate inputs, per-assignee capacity and remaining work with
+            the items that still have work, and tasks missing an original estimate.
+    """
+    total_working_days = capacity.get("totalWorkingDays", 0) or 0
+    assignees = {}
+    total_capacity = 0
+    for user in capacity.get("users", []):
+        activities = user.get("capacityPerDay", [])
+        capacity_per_day = sum(act.get("capacityPerDay") or 0 for act in activities)
+        days_off = user.get("numberOfDaysOff", 0) or 0
+        assignees[user["name"]] = {
+            "capacity_per_day": capacity_per_day,
+            "days_off": days_off,
+            "capacity_hours": (total_working_days - days_off) * capacity_per_day,
+            "remaining_work": 0,
+            "tasks": [],
+        }
+        # Same rule as the sprint-completion-rate tool: first activity only, users with capacity
+        first_activity = (activities[0].get("capacityPerDay") or 0) if activities else 0
+        if first_activity > 0:
+            total_capacity += (total_working_days - days_off) * first_activity
+
+    state_counts = {key: dict.fromkeys(list(STATE_BUCKETS.values()) + ["Other"], 0) for key in STATE_COUNT_TYPES.values()}
+    state_histogram = {}
+    task_ids = set()
+    for item in sprint_insights:
+        work_type = item.get("type") or "N/A"
+        state = item.get("current_state") or "N/A"
+        histogram = state_histogram.setdefault(work_type, {})
+        histogram[state] = histogram.get(state, 0) + 1
+        if work_type.lower() == "task":
+            task_ids.add(item["id"])
+        if state.lower() != "removed" and work_type.lower() in STATE_COUNT_TYPES:
+            state_counts[STATE_COUNT_TYPES[work_type.lower()]][STATE_BUCKETS.get(state.lower(), "Other")] += 1
+        # Remaining work for the detect-lagging-tasks tool: every assigned item with numeric remaining work
+        assigned_to = item.get("assigned_to")
+        remaining_work = item.get("remaining_work")
+        if assigned_to and isinstance(remaining_work, (int, float)) and not isinstance(remaining_work, bool):
+            entry = assignees.setdefault(assigned_to, {
+                "capacity_per_day": 0, "days_off": 0, "capacity_hours": 0,
+                "remaining_work": 0, "tasks": [],
+            })
+            entry["remaining_work"] += remaining_work
+            if remaining_work > 0:
+                entry["tasks"].append({
+                    "id": item["id"], "title": item.get("title"), "type": item.get("type"),
+                    "current_state": item.get("current_state"), "remaining_work": remaining_work,
+                })
+
+    completed_work = 0
+    missing_estimates = []
+    for task in task_efforts:
+        completed_work += task.get("completed_work") or 0
+        if task.get("id") in task_ids and not task.get("original_estimate"):
+            missing_estimates.append({"id": task["id"], "title": task.get("title"), "assigned_to": task.get("assigned_to")})
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "state_counts": state_counts,
+        "state_histogram": state_histogram,
+        "completion": {
+            "total_working_days": total_working_days,
+            "total_capacity": total_capacity,
+            "completed_work": completed_work,
+            "completion_rate": (completed_work / total_capacity) * 100 if total_capacity > 0 else 0,
+        },
+        "assignees": assignees,
+        "estimates": {
+            "tasks_without_original_estimate": len(missing_estimates),
+            "tasks": missing_estimates,
+        },
+    }
+
+def write_sprint_aggregates(sprint_insights=None, task_efforts=None, capacity=None, output_path=None, data_dir=None):
+    """
+    Writes sprint_aggregates.json. Inputs that are not passed are read from data_dir
+    (default: the data directory), which is also where the output goes by default.
+    """
+    data_dir = data_dir or DATA_DIR
+    if sprint_insights is None:
+        sprint_insights = _load_json(os.path.join(data_dir, "sprint_insights.json"), [])
+    if task_efforts is None:
+        task_efforts = _load_json(os.path.join(data_dir, "task_efforts.json"), [])
+    if capacity is None:
+        capacity = _load_json(os.path.join(data_dir, "capacity_structured.json"), {})
+    output_path = output_path or os.path.join(data_dir, os.path.basename(AGGREGATES_PATH))
+    with metrics.phase("aggregates"):
+        atomic_write_json(output_path, compute_sprint_aggregates(sprint_insights, task_efforts, capacity), indent=2)
+    print(f"[INFO] Sprint aggregates written to {output_path}")
@@ -0,0 +1,193 @@
+import os
+import json
+import sqlite3
+import tempfile
+from fileUtils import DEFAULT_FILE_MODE
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "sprint_insights.db")
+
+SCHEMA = """
+CREATE TABLE items (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    type TEXT COLLATE NOCASE,
+    current_state TEXT COLLATE NOCASE,
+    priority TEXT,
+    target_date TEXT,
+    created_date TEXT,
+    created_by TEXT,
+    description TEXT,
+    assigned_to TEXT,
+    assigned_date TEXT,
+    original_estimate REAL,
+    remaining_work REAL,
+    effort_time REAL,
+    tags TEXT
+);
+CREATE TABLE state_changes (
+    item_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    from_state TEXT,
+    to_state TEXT,
+    date TEXT,
+    PRIMARY KEY (item_id, seq)
+);
+CREATE TABLE links (
+    parent_id INTEGER NOT NULL,
+    child_id INTEGER NOT NULL,
+    PRIMARY KEY (parent_id, child_id)
+);
+CREATE TABLE comments (
+    item_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    date TEXT,
+    author TEXT,
+    comment TEXT,
+    PRIMARY KEY (item_id, seq)
+);
+CREATE TABLE pull_requests (
+    item_id INTEGER NOT NULL,
+    pull_request_id INTEGER NOT NULL,
+    repository TEXT,
+    title TEXT,
+    status TEXT,
+    created_by TEXT,
+    creation_date TEXT,
+    closed_date TEXT,
+    data TEXT,
+    PRIMARY KEY (item_id, pull_request_id)
+);
+CREATE INDEX idx_items_state ON items (current_state);
+CREATE INDEX idx_items_assigned_to ON items (assigned_to);
+CREATE INDEX idx_items_type ON items (type);
+CREATE INDEX idx_links_child ON links (child_id);
+"""
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_number(value):
+    return value if isinstance(value, (int, float)) else None
+
+class SqliteStoreWriter:
+    """
+    Writes sprint insights to an indexed SQLite database one item at a time, so callers can
+    stream items without holding them all. The database is built in a temporary file and renamed
+    into place when the writer is closed without error, so readers always see a complete database.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DB_PATH
+        fd, self.tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.db_path)}.", suffix=".tmp",
+                                             dir=os.path.dirname(os.path.abspath(self.db_path)))
+        os.close(fd)
+        try:
+            self.conn = sqlite3.connect(self.tmp_path)
+            self.conn.executescript(SCHEMA)
+        except BaseException:
+            os.remove(self.tmp_path)
+            raise
+
+    def add(self, item):
+        item_id = item["id"]
+        self.conn.execute("INSERT INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            item_id, item.get("title"), item.get("type"), item.get("current_state"),
+            str(item.get("priority")), item.get("target_date"), item.get("created_date"),
+            item.get("created_by"), item.get("description"), item.get("assigned_to"),
+            item.get("assigned_date"), _to_number(item.get("original_estimate")),
+            _to_number(item.get("remaining_work")), _to_number(item.get("effort_time")),
+            json.dumps(item.get("tags_added", [])),
+        ))
+        self.conn.executemany("INSERT INTO state_changes VALUES (?, ?, ?, ?, ?)", [
+            (item_id, seq, change.get("from"), change.get("to"), change.get("date"))
+            for seq, change in enumerate(item.get("state_changes", []))
+        ])
+        links = [(_to_int(parent_id), item_id) for parent_id in item.get("parents_link_added", [])]
+        links += [(item_id, _to_int(child_id)) for child_id in item.get("child_links_added", [])]
+        # A link is reported by both its parent and its child
+        self.conn.executemany("INSERT OR IGNORE INTO links VALUES (?, ?)",
+                              [link for link in links if None not in link])
+        self.conn.executemany("INSERT INTO comments VALUES (?, ?, ?, ?, ?)", [
+            (item_id, seq, comment.get("date"), comment.get("author"), comment.get("comment"))
+            for seq, comment in enumerate(item.get("comments_added", []))
+        ])
+        self.conn.executemany("INSERT OR IGNORE INTO pull_requests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+            (
+                item_id, pr.get("pullRequestId"), (pr.get("repository") or {}).get("name"),
+                pr.get("title"), pr.get("status"), (pr.get("createdBy") or {}).get("displayName"),
+                pr.get("creationDate"), pr.get("closedDate"), json.dumps(pr),
+            )
+            for pr in item.get("pull_requests", [])
+        ])
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+        os.chmod(self.tmp_path, DEFAULT_FILE_MODE)
+        os.replace(self.tmp_path, self.db_path)
+        print(f"[INFO] Sprint insights database written to {self.db_path}")
+
+    def abort(self):
+        self.conn.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def write_sqlite_store(sprint_insights, db_path=None):
+    """
+    Writes sprint insights to an indexed SQLite database next to sprint_insights.json.
+    Args:
+        sprint_insights (iterable): Insights as written to sprint_insights.json.
+        db_path (str, optional): Destination database. Defaults to sprint_insights.db in this directory.
+    """
+    with SqliteStoreWriter(db_path) as writer:
+        for item in sprint_insights:
+            writer.add(item)
+
+# -------------------- Queries --------------------
+def _query(sql, params=(), db_path=None):
+    conn = sqlite3.connect(f"file:{db_path or DB_PATH}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+def get_items_by_state(state, work_item_type=None, db_path=None):
+    """
+    Returns items in the given state (case-insensitive), optionally of one type.
+    """
+    sql = "SELECT id, title, type, current_state, assigned_to FROM items WHERE current_state = ?"
+    params = [state]
+    if work_item_type:
+        sql += " AND type = ?"
+        params.append(work_item_type)
+    return _query(sql + " ORDER BY id", params, db_path)
+
+def get_open_children_of_closed_parents(db_path=None):
+    """
+    Returns child items that are not closed while their parent is closed.
+    """
+    return _query(
+        """
+        SELECT child.id AS child_id, child.title AS child_title, child.current_state AS child_state,
+               parent.id AS parent_id, parent.title AS parent_title, parent.current_state AS parent_state
+        FROM links
+        JOIN items AS parent ON parent.id = links.parent_id
+        JOIN items AS child ON child.id = links.child_id
+        WHERE parent.current_state = 'closed' AND child.current_state <> 'closed'
+        ORDER BY child.id
+        """,
+        db_path=db_path,
+    )
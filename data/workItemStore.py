@@ -0,0 +1,40 @@
+import os
+import json
+from fileUtils import atomic_write_json
+
+STORE_PATH = os.path.join(os.path.dirname(__file__), "work_item_store.json")
+# Bumped whenever the layout of stored items changes; older stores are discarded
+STORE_VERSION = 3
+
+def load_store(area_path, iteration_path, store_path=None):
+    """
+    Loads the local work item store used by incremental sync.
+    Args:
+        area_path (str): Area path the store must have been built for.
+        iteration_path (str): Iteration path the store must have been built for.
+        store_path (str, optional): Path to the store file. Defaults to work_item_store.json next to this module.
+    Returns:
+        dict: The store, or an empty store when none exists or it belongs to another area/iteration.
+    """
+    store_path = store_path or STORE_PATH
+    empty = {"version": STORE_VERSION, "area_path": area_path, "iteration_path": iteration_path,
+             "watermark": None, "items": {}}
+    if not os.path.exists(store_path):
+        return empty
+    try:
+        with open(store_path, "r", encoding="utf-8") as f:
+            store = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Ignoring unreadable work item store {store_path}: {e}")
+        return empty
+    if store.get("version") != STORE_VERSION:
+        print("[INFO] Work item store has an old layout, starting a full sync")
+        return empty
+    if store.get("area_path") != area_path or store.get("iteration_path") != iteration_path:
+        print("[INFO] Work item store was built for another area/iteration, starting a full sync")
+        return empty
+    return store
+
+def save_store(store, store_path=None):
+    store_path = store_path or STORE_PATH
+    atomic_write_json(store_path, store)
@@ -106,6 +106,29 @@ app.delete("/mcp", async (req: Request, res: Response) => {
   );
 });
 
+// Metrics of the last data refresh: Prometheus text when the refresh writes it
+// ("prometheus_metrics": true in data/config.json), JSON otherwise. The JSON is written on
+// every refresh, so a .prom file older than it is left over from when the flag was on.
+const metricsJsonPath = path.join(__dirname, '..', 'data', 'refresh_metrics.json');
+const metricsPromPath = path.join(__dirname, '..', 'data', 'refresh_metrics.prom');
+
+app.get("/metrics", async (req: Request, res: Response) => {
+  try {
+    const promFresh = fs.existsSync(metricsPromPath) &&
+      (!fs.existsSync(metricsJsonPath) || fs.statSync(metricsPromPath).mtimeMs >= fs.statSync(metricsJsonPath).mtimeMs);
+    if (promFresh) {
+      res.type("text/plain; version=0.0.4").send(fs.readFileSync(metricsPromPath, 'utf-8'));
+    } else if (fs.existsSync(metricsJsonPath)) {
+      res.type("application/json").send(fs.readFileSync(metricsJsonPath, 'utf-8'));
+    } else {
+      res.status(404).json({ error: "No refresh metrics recorded yet." });
+    }
+  } catch (error) {
+    console.error("Error reading refresh metrics:", error);
+    res.status(500).json({ error: "Could not read refresh metrics." });
+  }
+});
+
 // Start the server
 const PORT = process.env.PORT || 3000;
 setupServer()
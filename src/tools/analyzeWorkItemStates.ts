@@ -9,47 +9,26 @@ export function registerAnalyzeWorkItemStatesTool(server: McpServer) {
     "Analyze sprint insights and return the count of work items by state (New, Committed, Active, Closed, Other) for Features, User Stories, and Tasks separately, ignoring removed items.",
     async () => {
       try {
-        execSync("python ./data/XsprintADO.py", { stdio: "inherit" });
+        execSync("python ./data/XsprintADO.py insights --primary", { stdio: "inherit" });
       } catch (e) {
         return { content: [{ type: "text", text: "Failed to update data from Python script." }] };
       }
-      // Always read the latest sprint_insights.json after running the Python script
-      const sprintInsightsPath = path.resolve(process.cwd(), "data/sprint_insights.json");
-      let sprintInsights: any[] = [];
+      // State counts are precomputed by the Python refresh in sprint_aggregates.json
+      const aggregatesPath = path.resolve(process.cwd(), "data/sprint_aggregates.json");
+      let stateCounts: any = null;
       try {
-        sprintInsights = JSON.parse(fs.readFileSync(sprintInsightsPath, "utf-8"));
+        stateCounts = JSON.parse(fs.readFileSync(aggregatesPath, "utf-8")).state_counts;
       } catch (e) {
-        return { content: [{ type: "text", text: "Could not load sprint_insights.json" }] };
+        stateCounts = null;
+      }
+      // An older or partial aggregates file may lack state_counts or one of its groups
+      if (!stateCounts || !stateCounts.features || !stateCounts.user_stories || !stateCounts.tasks) {
+        return { content: [{ type: "text", text: "Could not load sprint_aggregates.json" }] };
       }
-      // Ignore items with current_state 'removed'
-      const filtered = sprintInsights.filter(item => (item.current_state || '').toLowerCase() !== 'removed');
-      // Separate features, user stories, and tasks
-      const features = filtered.filter(item => (item.type || '').toLowerCase() === 'feature');
-      const userStories = filtered.filter(item => (item.type || '').toLowerCase() === 'user story');
-      const tasks = filtered.filter(item => (item.type || '').toLowerCase() === 'task');
-
-      const getStateCounts = (items: any[]) => {
-        const stateCounts = {
-          New: 0,
-          Committed: 0,
-          Active: 0,
-          Closed: 0,
-          Other: 0,
-        };
-        for (const item of items) {
-          const state = (item.current_state || "").toLowerCase();
-          if (state === "new") stateCounts.New++;
-          else if (state === "committed") stateCounts.Committed++;
-          else if (state === "active") stateCounts.Active++;
-          else if (state === "closed") stateCounts.Closed++;
-          else stateCounts.Other++;
-        }
-        return stateCounts;
-      };
 
-      const featureCounts = getStateCounts(features);
-      const userStoryCounts = getStateCounts(userStories);
-      const taskCounts = getStateCounts(tasks);
+      const featureCounts = stateCounts.features;
+      const userStoryCounts = stateCounts.user_stories;
+      const taskCounts = stateCounts.tasks;
 
       return {
         content: [
@@ -9,26 +9,13 @@ import { dirname } from 'path';
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
 
-interface CapacityUser {
-  name: string;
-  capacityPerDay: { activity: string; capacityPerDay: number }[];
-  numberOfDaysOff: number;
-}
-
-interface CapacityData {
-  totalWorkingDays: number;
-  users: CapacityUser[];
-}
-
-interface SprintTask {
-  id: number;
-  title: string;
-  type: string;
-  assigned_date?: string;
-  created_by?: string;
-  current_state?: string;
-  remaining_work?: number;
-  assigned_to?: string;
+// Per-assignee entry of sprint_aggregates.json, precomputed by the Python refresh
+interface AssigneeAggregate {
+  capacity_per_day: number;
+  days_off: number;
+  capacity_hours: number;
+  remaining_work: number;
+  tasks: { id: number; title: string; type: string; current_state?: string; remaining_work: number }[];
 }
 
 function getSprintEndDate(configPath: string): Date | null {
@@ -70,61 +57,41 @@ function getDaysLeftInSprint(configPath: string): number {
 }
 
 function detectLaggingTasks(
-  capacityPath: string,
-  sprintInsightsPath: string,
+  aggregatesPath: string,
   laggingFactor: number = 1,
   configPath: string = path.join(__dirname, '../../data/config.json')
 ) {
-  const capacityData: CapacityData = JSON.parse(fs.readFileSync(capacityPath, 'utf-8'));
-  const sprintInsights: SprintTask[] = JSON.parse(fs.readFileSync(sprintInsightsPath, 'utf-8'));
-  const daysLeft = getDaysLeftInSprint(configPath);
-
-  // Build a map of user -> total capacity (sum of all activities * days left)
-  const userCapacity: Record<string, number> = {};
-  for (const user of capacityData.users) {
-    const totalCapacityPerDay = user.capacityPerDay.reduce((sum, act) => sum + (act.capacityPerDay || 0), 0);
-    const totalCapacity = totalCapacityPerDay * daysLeft;
-    userCapacity[user.name] = totalCapacity;
-  }
-
-  // Build a map of user -> total remaining work (sum of all their tasks' remaining work)
-  const userRemainingWork: Record<string, number> = {};
-  const userTasks: Record<string, SprintTask[]> = {};
-  for (const task of sprintInsights) {
-    if (!task.assigned_to || typeof task.remaining_work !== 'number') continue;
-    userRemainingWork[task.assigned_to] = (userRemainingWork[task.assigned_to] || 0) + task.remaining_work;
-    if (!userTasks[task.assigned_to]) userTasks[task.assigned_to] = [];
-    userTasks[task.assigned_to].push(task);
+  const assignees: Record<string, AssigneeAggregate> | undefined =
+    JSON.parse(fs.readFileSync(aggregatesPath, 'utf-8')).assignees;
+  // An older or partial aggregates file may lack the per-assignee section
+  if (!assignees || typeof assignees !== 'object') {
+    throw new Error('sprint_aggregates.json has no assignees');
   }
+  const daysLeft = getDaysLeftInSprint(configPath);
 
-  // Find users whose total remaining work >= capacity * laggingFactor
-  const laggingUsers = Object.keys(userRemainingWork).filter(user => {
-    const capacity = userCapacity[user] ?? 0;
-    if (!capacity) return false;
-    return userRemainingWork[user] >= capacity * laggingFactor;
-  });
-
-  // Prepare output: for each lagging user, show their total remaining work, capacity, and only list their tasks with remaining work > 0
-  const laggingResults = laggingUsers.map(user => {
-    const tasksWithWork = (userTasks[user] || []).filter(task => (task.remaining_work ?? 0) > 0);
-    return {
+  // Find users whose total remaining work >= capacity (capacity per day * days left) * laggingFactor
+  const laggingResults = [];
+  for (const [user, entry] of Object.entries(assignees)) {
+    const capacity = (entry.capacity_per_day || 0) * daysLeft;
+    if (!capacity || entry.remaining_work < capacity * laggingFactor) continue;
+    // Tasks are the user's items with remaining work > 0
+    laggingResults.push({
       user,
-      total_remaining_work: userRemainingWork[user],
-      user_capacity: userCapacity[user],
-      threshold: userCapacity[user] * laggingFactor,
-      tasks: tasksWithWork,
-    };
-  });
+      total_remaining_work: entry.remaining_work,
+      user_capacity: capacity,
+      threshold: capacity * laggingFactor,
+      tasks: entry.tasks || [],
+    });
+  }
 
   return laggingResults;
 }
 
 // CLI usage example
 function run() {
-  const capacityPath = path.resolve(process.cwd(), "data/capacity_structured.json");
-  const sprintInsightsPath = path.resolve(process.cwd(), "data/sprint_insights.json");
+  const aggregatesPath = path.resolve(process.cwd(), "data/sprint_aggregates.json");
   const laggingFactor = 1;
-  const laggingTasks = detectLaggingTasks(capacityPath, sprintInsightsPath, laggingFactor);
+  const laggingTasks = detectLaggingTasks(aggregatesPath, laggingFactor);
   console.log('Lagging tasks:', JSON.stringify(laggingTasks, null, 2));
 }
 
@@ -141,15 +108,19 @@ export function registerDetectLaggingTasksTool(server: McpServer) {
     },
     async (params: { laggingFactor?: number }) => {
       try {
-        execSync("python ./data/XsprintADO.py", { stdio: "inherit" });
+        execSync("python ./data/XsprintADO.py insights capacity --primary", { stdio: "inherit" });
       } catch (e) {
         return { content: [{ type: "text", text: "Failed to update data from Python script." }] };
       }
       const laggingFactor = params.laggingFactor ?? 1;
-      const capacityPath = path.resolve(process.cwd(), "data/capacity_structured.json");
-      const sprintInsightsPath = path.resolve(process.cwd(), "data/sprint_insights.json");
-      // Always read the latest data after running the Python script
-      const laggingTasks = detectLaggingTasks(capacityPath, sprintInsightsPath, laggingFactor);
+      // Remaining work and capacity per assignee are precomputed by the Python refresh
+      const aggregatesPath = path.resolve(process.cwd(), "data/sprint_aggregates.json");
+      let laggingTasks;
+      try {
+        laggingTasks = detectLaggingTasks(aggregatesPath, laggingFactor);
+      } catch (e) {
+        return { content: [{ type: "text", text: "Could not load sprint_aggregates.json" }] };
+      }
       return {
         content: [
           {
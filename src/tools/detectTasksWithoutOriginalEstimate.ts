@@ -10,35 +10,23 @@ export function registerDetectTasksWithoutOriginalEstimateTool(server: McpServer
     async () => {
       // Always update data before reading
       try {
-        execSync("python ./data/XsprintADO.py", { stdio: "inherit" });
+        execSync("python ./data/XsprintADO.py insights --primary", { stdio: "inherit" });
       } catch (e) {
         return { content: [{ type: "text", text: "Failed to update data from Python script." }] };
       }
-      // Read from sprint_insights.json to get type info
-      const sprintInsightsPath = path.resolve(process.cwd(), "data/sprint_insights.json");
-      let sprintInsights: any[] = [];
+      // Tasks without an original estimate (null, undefined, or 0) are precomputed by the
+      // Python refresh in sprint_aggregates.json from task_efforts.json and sprint_insights.json
+      const aggregatesPath = path.resolve(process.cwd(), "data/sprint_aggregates.json");
+      let tasksWithoutEstimate: any[] | null = null;
       try {
-        sprintInsights = JSON.parse(fs.readFileSync(sprintInsightsPath, "utf-8"));
+        tasksWithoutEstimate = JSON.parse(fs.readFileSync(aggregatesPath, "utf-8")).estimates?.tasks;
       } catch (e) {
-        return { content: [{ type: "text", text: "Could not load sprint_insights.json" }] };
+        tasksWithoutEstimate = null;
       }
-      // Read from task_efforts.json to get estimate info
-      const effortsPath = path.resolve(process.cwd(), "data/task_efforts.json");
-      let effortsData: any[] = [];
-      try {
-        effortsData = JSON.parse(fs.readFileSync(effortsPath, "utf-8"));
-      } catch (e) {
-        return { content: [{ type: "text", text: "Could not load task_efforts.json" }] };
-      }
-      // Build a map of id -> type from sprint_insights
-      const typeMap = new Map<number, string>();
-      for (const item of sprintInsights) {
-        typeMap.set(item.id, (item.type || '').toLowerCase());
+      // An older or partial aggregates file may lack the task list
+      if (!Array.isArray(tasksWithoutEstimate)) {
+        return { content: [{ type: "text", text: "Could not load sprint_aggregates.json" }] };
       }
-      // Find tasks with no original estimate (null, undefined, or 0)
-      const tasksWithoutEstimate = effortsData.filter(
-        t => (typeMap.get(t.id) === 'task') && (t.original_estimate === null || t.original_estimate === undefined || t.original_estimate === 0)
-      );
       return {
         content: [
           {
@@ -6,11 +6,11 @@ import { execSync } from "child_process";
 export function registerFlagOpenChildrenOfClosedParentTool(server: McpServer) {
   return server.tool(
     "flag-open-children-of-closed-parent",
-    "Detect child items whose parent item is closed and child is not closed (using parents_link_added array).",
+    "Detect child items whose parent item is closed and child is not closed (using hierarchy.json, including parents outside the iteration, and the parents_link_added array).",
     async () => {
       // Always update data before reading
       try {
-        execSync("python ./data/XsprintADO.py", { stdio: "inherit" });
+        execSync("python ./data/XsprintADO.py insights hierarchy --primary", { stdio: "inherit" });
       } catch (e) {
         return { content: [{ type: "text", text: "Failed to update data from Python script." }] };
       }
@@ -21,32 +21,51 @@ export function registerFlagOpenChildrenOfClosedParentTool(server: McpServer) {
       } catch (e) {
         return { content: [{ type: "text", text: "Could not load sprint_insights.json" }] };
       }
+      // Parent/child index of the iteration, including parents and children outside it
+      let hierarchy: any = { items: {}, parents: {} };
+      const hierarchyPath = path.resolve(process.cwd(), "data/hierarchy.json");
+      if (fs.existsSync(hierarchyPath)) {
+        try {
+          hierarchy = JSON.parse(fs.readFileSync(hierarchyPath, "utf-8"));
+        } catch (e) {
+          console.error("Could not load hierarchy.json:", e);
+        }
+      }
       // Build a map of id -> item for quick lookup
       const itemMap = new Map<number, any>();
+      for (const node of Object.values<any>(hierarchy.items || {})) {
+        itemMap.set(node.id, { id: node.id, title: node.title, current_state: node.state });
+      }
       for (const item of sprintInsights) {
         itemMap.set(item.id, item);
       }
-      // Find child items whose parent is closed and child is not closed (using parents_link_added)
+      // Find child items whose parent is closed and child is not closed
       const flaggedChildren = [];
       for (const item of sprintInsights) {
+        const parentIds = new Set<number>();
+        if (hierarchy.parents && hierarchy.parents[String(item.id)] !== undefined) {
+          parentIds.add(Number(hierarchy.parents[String(item.id)]));
+        }
         if (item.parents_link_added && Array.isArray(item.parents_link_added)) {
           for (const parentIdStr of item.parents_link_added) {
-            const parentId = Number(parentIdStr);
-            if (itemMap.has(parentId)) {
-              const parent = itemMap.get(parentId);
-              if (
-                (parent.current_state || "").toLowerCase() === "closed" &&
-                (item.current_state || "").toLowerCase() !== "closed"
-              ) {
-                flaggedChildren.push({
-                  child_id: item.id,
-                  child_title: item.title,
-                  child_state: item.current_state,
-                  parent_id: parent.id,
-                  parent_title: parent.title,
-                  parent_state: parent.current_state,
-                });
-              }
+            parentIds.add(Number(parentIdStr));
+          }
+        }
+        for (const parentId of parentIds) {
+          if (itemMap.has(parentId)) {
+            const parent = itemMap.get(parentId);
+            if (
+              (parent.current_state || "").toLowerCase() === "closed" &&
+              (item.current_state || "").toLowerCase() !== "closed"
+            ) {
+              flaggedChildren.push({
+                child_id: item.id,
+                child_title: item.title,
+                child_state: item.current_state,
+                parent_id: parent.id,
+                parent_title: parent.title,
+                parent_state: parent.current_state,
+              });
             }
           }
         }
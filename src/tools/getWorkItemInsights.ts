@@ -4,6 +4,64 @@ import { McpServer } from "@modelcontextprotocol/sdk/server/mcp.js";
 import fs from "fs";
 import path from "path";
 
+// Finds an item's text by reading every line of the text file, skipping unparsable lines
+function scanItemText(textPath: string, id: number): any | null {
+  try {
+    for (const line of fs.readFileSync(textPath, "utf-8").split("\n")) {
+      if (!line) {
+        continue;
+      }
+      try {
+        const text = JSON.parse(line);
+        if (text.id === id) {
+          return text;
+        }
+      } catch (e) {
+        // Truncated line of a text file being replaced
+      }
+    }
+  } catch (e) {
+    console.error("Could not read sprint_insights_text.ndjson:", e);
+  }
+  return null;
+}
+
+// In compact mode descriptions and comments live in a side file, indexed by work item ID
+function loadItemText(id: number): any | null {
+  const indexPath = path.resolve(process.cwd(), "data/sprint_insights_text.index.json");
+  const textPath = path.resolve(process.cwd(), "data/sprint_insights_text.ndjson");
+  if (!fs.existsSync(textPath)) {
+    return null;
+  }
+  let entry: any = null;
+  try {
+    entry = JSON.parse(fs.readFileSync(indexPath, "utf-8"))[String(id)];
+  } catch (e) {
+    // Missing, truncated or unreadable index: fall back to scanning the text file
+    return scanItemText(textPath, id);
+  }
+  if (!entry) {
+    return null;
+  }
+  try {
+    const [offset, length] = entry;
+    const buffer = Buffer.alloc(length);
+    const fd = fs.openSync(textPath, "r");
+    try {
+      fs.readSync(fd, buffer, 0, length, offset);
+    } finally {
+      fs.closeSync(fd);
+    }
+    const text = JSON.parse(buffer.toString("utf-8"));
+    if (text.id === id) {
+      return text;
+    }
+  } catch (e) {
+    // Stale offset from a refresh that replaced the text file after the index was read
+  }
+  return scanItemText(textPath, id);
+}
+
 export function registerGenerateWorkItemFieldSummaryTool(server: McpServer) {
   return server.tool(
     "generate-workitem-field-summary",
@@ -13,7 +71,7 @@ export function registerGenerateWorkItemFieldSummaryTool(server: McpServer) {
     },
     async (params: { id: number }) => {
       try {
-        execSync("python ./data/XsprintADO.py", { stdio: "inherit" });
+        execSync("python ./data/XsprintADO.py insights --primary", { stdio: "inherit" });
       } catch (e) {
         return { content: [{ type: "text", text: "Failed to update data from Python script." }] };
       }
@@ -26,6 +84,9 @@ export function registerGenerateWorkItemFieldSummaryTool(server: McpServer) {
         return { content: [{ type: "text", text: "Could not load sprint_insights.json" }] };
       }
       const item = sprintInsights.find((wi) => wi.id === params.id && (wi.current_state || '').toLowerCase() !== 'removed');
+      if (item && !("description" in item)) {
+        Object.assign(item, loadItemText(params.id) || {});
+      }
       if (!item) {
         return {
           content: [
@@ -13,7 +13,7 @@ export function registerGetWorkItemsByStateTool(server: McpServer) {
     },
     async (params: { state: string }) => {
       try {
-        execSync("python ./data/XsprintADO.py", { stdio: "inherit" });
+        execSync("python ./data/XsprintADO.py insights --primary", { stdio: "inherit" });
       } catch (e) {
         return { content: [{ type: "text", text: "Failed to update data from Python script." }] };
       }
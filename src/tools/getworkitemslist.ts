@@ -9,7 +9,7 @@ export function registerListSprintWorkItemsTool(server: McpServer) {
     "List all work items in the sprint, grouped by Feature, User Story, and Task, including assigned user and current state. Excludes items with state 'removed'.",
     async () => {
       try {
-        execSync("python ./data/XsprintADO.py", { stdio: "inherit" });
+        execSync("python ./data/XsprintADO.py insights --primary", { stdio: "inherit" });
       } catch (e) {
         return { content: [{ type: "text", text: "Failed to update data from Python script." }] };
       }